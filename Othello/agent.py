@@ -9,6 +9,58 @@ import time
 # explicitly import from the Othello package:
 from Othello.game import Player
 from Othello.othello import State, OthelloMove, PLAYER1, PLAYER2
+from Othello.transposition import TranspositionTable, EXACT, LOWER, UPPER, DEPTH, FLAG, SCORE, MOVE
+from Othello.evaluation import PositionalEvaluator
+from Othello.endgame import EndgameSolver, SolverTimeout
+
+# mixed into transposition keys for maximizing nodes, in case an agent's goal does not follow the side to move
+MAXIMIZER_KEY = 0x6A09E667F3BCC908
+
+# a timed search looks at the clock once every this many nodes (must be a power of two)
+TIME_CHECK_INTERVAL = 256
+
+
+# raised inside a timed search when the deadline passes; the unfinished iteration is discarded
+class SearchTimeout(Exception):
+    pass
+
+
+# Returns moves with the one at 'first' ((x, y) from a transposition entry) moved to the front
+def order_first(moves, first):
+    if first is None:
+        return moves
+    for i, move in enumerate(moves):
+        if move.x == first[0] and move.y == first[1]:
+            if i:
+                moves = [move] + moves[:i] + moves[i+1:]
+            break
+    return moves
+
+
+# Static move-ordering value of each square of an 8x8 board, indexed x*8 + y: corners first, then edges and the
+# centre, with the squares next to a corner (which tend to give the corner away) last
+SQUARE_ORDER = [
+    100, -20, 10,  5,  5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+     10,  -2,  1,  1,  1,  1,  -2,  10,
+      5,  -2,  1,  0,  0,  1,  -2,   5,
+      5,  -2,  1,  0,  0,  1,  -2,   5,
+     10,  -2,  1,  1,  1,  1,  -2,  10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10,  5,  5, 10, -20, 100,
+]
+
+# move-ordering ranks above anything the history and static values can reach
+ORDER_TT = 1 << 40
+ORDER_FIRST = 1 << 39
+ORDER_CORNER = 1 << 38
+ORDER_KILLER = 1 << 37
+
+# killer moves remembered per depth
+KILLER_SLOTS = 2
+
+# AlphaBeta solves positions with at most this many empty squares exactly instead of searching them
+ENDGAME_EMPTIES = 10
 
 class HumanPlayer(Player):
     def __init__(self):
@@ -34,9 +86,15 @@ class RandomAgent(Player):
 
 
 class MinimaxAgent(Player):
-    def __init__(self, depth: int):
+    # ttSize > 0 keeps a transposition table of that many buckets across moves; off by default
+    # evaluator scores the leaves (see Othello/evaluation.py); the positional heuristic by default
+    # book is an Othello.book.OpeningBook consulted before searching
+    def __init__(self, depth: int, ttSize: int = 0, evaluator = None, book = None):
         super().__init__()
         self.depth = depth
+        self.tt = TranspositionTable(ttSize) if ttSize > 0 else None
+        self.evaluator = evaluator if evaluator is not None else PositionalEvaluator()
+        self.book = book
         self.id = ""
         # Determine whether this agent is Player 1 or 2 by looking at sys.argv
         if len(sys.argv) > 1 and sys.argv[1] == "minimax":
@@ -48,58 +106,110 @@ class MinimaxAgent(Player):
         moves = state.generateMoves()
         if len(moves) < 1:
             return None
+        if self.book is not None:
+            move = self.book.lookup(state)
+            if move is not None:
+                return move
 
         if self.id == 'Player 1':
             return self.search(state, 'max', self.depth)
         else:
             return self.search(state, 'min', self.depth)
 
+    # Depth-first negamax to depthLimit plies: only the current path is held in memory, no tree is built.
+    # Positions with no move for the side to move are scored by the evaluator and ties go to the first
+    # move in generateMoves() order, so the choice is that of a plain minimax to the same depth.
+    # The search makes and unmakes moves on one private copy of state.
     def search(self, state: State, goal: str, depthLimit: int):
-        root = node(state, None, None, goal, None, 0)
-        stateSpace = []
-        root.expand(depthLimit)
-
+        state = state.clone()
+        state.heuristic()  # from here on make/unmake keep the value up to date
+        moves = state.legalMoves()
         # No legal moves -> pass
-        if len(root.children) < 1:
+        if len(moves) < 1:
             return None
         # Exactly one move -> pick it
-        if len(root.children) == 1:
-            return root.children[0].move
-
-        # Otherwise build the state‐space up to depthLimit
-        for child in root.children:
-            stateSpace.append(child)
-        for n in stateSpace:
-            n.expand(depthLimit)
-            for child in n.children:
-                stateSpace.append(child)
-
-        currentDepth = depthLimit
-        while currentDepth > 0:
-            for n in stateSpace:
-                if n.depth == currentDepth:
-                    n.parent.scoreParent()
-                    n.parent.children.clear
-            currentDepth -= 1
-
-        # Choose the best child
-        bestChild = root.children[0]
-        if root.goal == 'max':
-            for child in root.children:
-                if child.score > bestChild.score:
-                    bestChild = child
-        else:
-            for child in root.children:
-                if child.score < bestChild.score:
-                    bestChild = child
+        if len(moves) == 1:
+            return moves[0]
+
+        color = 1 if goal == 'max' else -1
+        if self.tt is not None:
+            self.tt.new_search()
+            entry = self.tt.probe(self.ttKey(state, color))
+            # the entry may belong to another position with a colliding key, so only a legal move is played
+            if entry is not None and entry[DEPTH] >= depthLimit and entry[MOVE] is not None:
+                for move in moves:
+                    if (move.x, move.y) == entry[MOVE]:
+                        return move
+
+        best = -math.inf
+        bestMove = None
+        for move in moves:
+            undo = state.make_move(move)
+            score = -self.negamax(state, depthLimit - 1, -color)
+            state.unmake_move(undo)
+            if score > best:
+                best, bestMove = score, move
+
+        if self.tt is not None:
+            self.tt.store(self.ttKey(state, color), depthLimit, EXACT, best, (bestMove.x, bestMove.y))
+        return bestMove
+
+    # value of state for the side given by color (+1 maximizes the evaluation, -1 minimizes it)
+    def negamax(self, state: State, depth: int, color: int):
+        if depth <= 0:
+            return color * self.evaluator.evaluate(state)
+        moves = state.legalMoves()
+        if len(moves) < 1:
+            return color * self.evaluator.evaluate(state)
+
+        if self.tt is not None:
+            key = self.ttKey(state, color)
+            entry = self.tt.probe(key)
+            if entry is not None and entry[FLAG] == EXACT and entry[DEPTH] >= depth:
+                return entry[SCORE]
 
-        return bestChild.move
+        best = -math.inf
+        for move in moves:
+            undo = state.make_move(move)
+            score = -self.negamax(state, depth - 1, -color)
+            state.unmake_move(undo)
+            if score > best:
+                best = score
+
+        if self.tt is not None:
+            self.tt.store(key, depth, EXACT, best)
+        return best
+
+    def ttKey(self, state: State, color: int):
+        return state.hash_key() ^ (MAXIMIZER_KEY if color > 0 else 0)
 
 
 class AlphaBeta(Player):
-    def __init__(self, depth: int):
+    # the transposition table (ttSize buckets, 0 disables it) persists across choose_move calls in a game
+    # with moveTimeMs set the search deepens iteratively until that wall-clock budget runs out and
+    # 'depth' only caps how deep it may go
+    # evaluator scores the leaves (see Othello/evaluation.py); the positional heuristic by default
+    # ordering=False searches moves in generateMoves() order, apart from the transposition-table move
+    # book is an Othello.book.OpeningBook consulted before searching
+    # at endgameEmpties empty squares or fewer the move comes from the exact endgame solver; 0 turns it off
+    def __init__(self, depth: int, ttSize: int = 1 << 14, moveTimeMs: int = None, evaluator = None,
+                 ordering: bool = True, book = None, endgameEmpties: int = ENDGAME_EMPTIES):
         super().__init__()
         self.depth = depth
+        self.tt = TranspositionTable(ttSize) if ttSize > 0 else None
+        self.evaluator = evaluator if evaluator is not None else PositionalEvaluator()
+        self.book = book
+        self.endgameEmpties = endgameEmpties
+        self.endgame = None
+        self.moveTimeMs = moveTimeMs
+        # move ordering: killers[depth] holds the last moves that caused a cutoff at that depth,
+        # history[(player, x, y)] how much cutting off with that move has saved so far
+        self.ordering = ordering
+        self.killers = {}
+        self.history = {}
+        self.deadline = None
+        self.nodes = 0
+        self.completedDepth = 0
         self.id = ""
         self.startTime = time.time() * 1000
         self.totalTime = time.time() * 1000 - self.startTime
@@ -111,109 +221,218 @@ class AlphaBeta(Player):
 
     def choose_move(self, state: State):
         self.startTime = time.time() * 1000
-        moves = state.generateMoves()
+        moves = state.legalMoves()
         if len(moves) < 1:
             return None
         if len(moves) == 1:
             return moves[0]
-
-        if self.id == 'Player 1':
-            root = node(state, None, None, 'max', None, 0)
+        if self.book is not None:
+            move = self.book.lookup(state)
+            if move is not None:
+                return move
+        # the exact solver only works on 8x8 bitboards
+        if state.boardSize == 8 and state.num_empties() <= self.endgameEmpties:
+            move = self.solveEndgame(state, moves)
+            if move is not None:
+                return move
+
+        if self.tt is not None:
+            self.tt.new_search()
+        self.nodes = 0
+        self.killers = {}
+        # older history still says something about this game, but should not outweigh the new search
+        for key in self.history:
+            self.history[key] >>= 1
+        maximizing = self.id == 'Player 1'
+        # searches make and unmake moves on a private copy; a timeout can abandon it mid-line
+        state = state.clone()
+        state.heuristic()  # from here on make/unmake keep the value up to date
+        if self.moveTimeMs is None:
+            best, bestMove = self.ABSearch(state, self.depth, -math.inf, math.inf, maximizing, root=True)
+            self.completedDepth = self.depth
         else:
-            root = node(state, None, None, 'min', None, 0)
-
-        best = self.ABSearch(self.depth, -math.inf, math.inf, root)
-        for child in root.children:
-            if child.score == best:
-                self.totalTime = time.time() * 1000 - self.startTime
-                print(f"Total Time = {self.totalTime/1000} seconds")
-                return child.move
-
-    def ABSearch(self, depthLimit, alpha, beta, parent):
-        # Terminal test
-        if parent.depth >= depthLimit or parent.state.game_over():
-            return parent.state.heuristic()
-
-        moves = parent.state.generateMoves()
+            bestMove = self.iterativeDeepening(state, maximizing)
+        self.totalTime = time.time() * 1000 - self.startTime
+        print(f"Total Time = {self.totalTime/1000} seconds")
+        print(f"Nodes searched = {self.nodes} (depth {self.completedDepth})")
+        return bestMove
+
+    # Plays the move of perfect play to the end of the game, as found by the endgame solver
+    # With a move time budget the solver first decides win / draw / loss within half of it, then looks for the
+    # best disc difference in what is left; if that runs out the win / draw / loss move is played, and if even
+    # the first pass runs out this returns None and the iterative deepening search takes over
+    def solveEndgame(self, state, moves):
+        if self.endgame is None:
+            self.endgame = EndgameSolver()
+        p1, p2, side = state.pack()
+        own, opp = (p1, p2) if side == PLAYER1 else (p2, p1)
+        if self.moveTimeMs is None:
+            score, square = self.endgame.solve(own, opp)
+            self.nodes = self.endgame.nodes
+            result = f"final disc difference {score:+d}"
+        else:
+            try:
+                score, square = self.endgame.solve(own, opp, wld=True,
+                                                   deadline=(self.startTime + self.moveTimeMs / 2) / 1000)
+            except SolverTimeout:
+                print(f"Endgame not solved within the time budget ({self.endgame.nodes} nodes)")
+                return None
+            self.nodes = self.endgame.nodes
+            result = "win" if score > 0 else "loss" if score < 0 else "draw"
+            try:
+                score, square = self.endgame.solve(own, opp, deadline=(self.startTime + self.moveTimeMs) / 1000)
+                result = f"final disc difference {score:+d}"
+            except SolverTimeout:
+                pass
+            self.nodes += self.endgame.nodes
+        self.totalTime = time.time() * 1000 - self.startTime
+        print(f"Total Time = {self.totalTime/1000} seconds")
+        print(f"Nodes searched = {self.nodes} (endgame solved, {result})")
+        for move in moves:
+            if move.x * 8 + move.y == square:
+                return move
+        return moves[0]
+
+    # Searches depth 1, 2, ... until the move time budget is spent and returns the best move of the
+    # deepest iteration that finished. Each iteration searches the previous best move first.
+    # Depth 1 always runs to completion so there is a move to return.
+    def iterativeDeepening(self, state, maximizing):
+        start = time.time()
+        # the budget counts from the start of choose_move, which may already have spent some of it
+        deadline = (self.startTime + self.moveTimeMs) / 1000
+        maxDepth = min(self.depth, state.num_empties())
+        bestMove = None
+        self.completedDepth = 0
+        try:
+            for depth in range(1, maxDepth + 1):
+                self.deadline = deadline if depth > 1 else None
+                try:
+                    best, bestMove = self.ABSearch(state, depth, -math.inf, math.inf, maximizing,
+                                                   root=True, first=bestMove)
+                except SearchTimeout:
+                    break
+                self.completedDepth = depth
+                # the next iteration costs several times this one; do not start what cannot finish
+                if time.time() - start >= (deadline - start) / 2:
+                    break
+        finally:
+            self.deadline = None
+        return bestMove
+
+    # Returns moves sorted for the search: the transposition-table move, then 'first', corners, killer moves
+    # for this depth, and the rest by history score plus the static square value
+    # ttMove and first are (x, y) or None; equal ranks keep generateMoves() order
+    def orderMoves(self, state, moves, depth, ttMove, first):
+        if not self.ordering:
+            if first is not None:
+                moves = order_first(moves, first)
+            return order_first(moves, ttMove)
+        last = state.boardSize - 1
+        static = SQUARE_ORDER if state.boardSize == 8 else None
+        killers = self.killers.get(depth, ())
+        history = self.history
+
+        def rank(move):
+            xy = (move.x, move.y)
+            if xy == ttMove:
+                return ORDER_TT
+            if xy == first:
+                return ORDER_FIRST
+            if move.x in (0, last) and move.y in (0, last):
+                return ORDER_CORNER
+            if xy in killers:
+                return ORDER_KILLER
+            value = history.get((move.player, move.x, move.y), 0)
+            if static is not None:
+                value += static[move.x * 8 + move.y]
+            return value
+
+        return sorted(moves, key=rank, reverse=True)
+
+    # records a move that caused a beta cutoff at 'depth' as a killer and in the history table
+    def recordCutoff(self, move, depth):
+        killers = self.killers.setdefault(depth, [])
+        xy = (move.x, move.y)
+        if xy not in killers:
+            killers.insert(0, xy)
+            del killers[KILLER_SLOTS:]
+        key = (move.player, move.x, move.y)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    # Alpha-beta over 'depth' more plies; scores are evaluator values, which PLAYER1 maximizes
+    # The first move in search order that reaches the best score wins ties. Results go to the transposition
+    # table as exact scores or bounds, and a stored best move is searched first on the next visit.
+    # 'first' is a move to try first at the root. Returns the score, or (score, best move) when root is True
+    def ABSearch(self, state, depth, alpha, beta, maximizing, root=False, first=None):
+        self.nodes += 1
+        if self.deadline is not None and not (self.nodes & (TIME_CHECK_INTERVAL - 1)):
+            if time.time() >= self.deadline:
+                raise SearchTimeout()
+
+        # Terminal test: depth exhausted, or no move for the side to move (this includes game over)
+        if depth <= 0:
+            return self.evaluator.evaluate(state)
+        moves = state.legalMoves()
         if len(moves) < 1:
-            return parent.state.heuristic()
-
-        if parent.goal == 'max':
-            maximum = -math.inf
+            return self.evaluator.evaluate(state)
+
+        # nodes one ply above the leaves are cheaper to search than to look up
+        tt = self.tt if depth > 1 else None
+        ttMove = None
+        if tt is not None:
+            key = state.hash_key() ^ (MAXIMIZER_KEY if maximizing else 0)
+            entry = tt.probe(key)
+            if entry is not None:
+                if entry[DEPTH] >= depth and not root:
+                    score = entry[SCORE]
+                    if entry[FLAG] == EXACT:
+                        return score
+                    if entry[FLAG] == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if beta <= alpha:
+                        return score
+                ttMove = entry[MOVE]
+        if len(moves) > 1:
+            moves = self.orderMoves(state, moves, depth, ttMove, None if first is None else (first.x, first.y))
+        alphaOrig, betaOrig = alpha, beta
+
+        bestMove = None
+        if maximizing:
+            best = -math.inf
             for move in moves:
-                newState = parent.state.applyMoveCloning(move)
-                newNode = node(newState, parent, None, 'min', move, parent.depth+1)
-                parent.children.append(newNode)
-                maximum = max(maximum, self.ABSearch(depthLimit, alpha, beta, newNode))
-                newNode.score = maximum
-                alpha = max(alpha, maximum)
+                undo = state.make_move(move)
+                score = self.ABSearch(state, depth - 1, alpha, beta, False)
+                state.unmake_move(undo)
+                if score > best:
+                    best, bestMove = score, move
+                alpha = max(alpha, best)
                 if beta <= alpha:
+                    self.recordCutoff(move, depth)
                     break
-            return maximum
-
-        else:  # parent.goal == 'min'
-            minimum = math.inf
+        else:
+            best = math.inf
             for move in moves:
-                newState = parent.state.applyMoveCloning(move)
-                newNode = node(newState, parent, None, 'max', move, parent.depth+1)
-                parent.children.append(newNode)
-                minimum = min(minimum, self.ABSearch(depthLimit, alpha, beta, newNode))
-                newNode.score = minimum
-                beta = min(beta, minimum)
+                undo = state.make_move(move)
+                score = self.ABSearch(state, depth - 1, alpha, beta, True)
+                state.unmake_move(undo)
+                if score < best:
+                    best, bestMove = score, move
+                beta = min(beta, best)
                 if beta <= alpha:
+                    self.recordCutoff(move, depth)
                     break
-            return minimum
 
-
-class node:
-    def __init__(self, state, parent, score, goal, move, depth):
-        self.parent = parent
-        self.children = []
-        self.score = score
-        self.state = state
-        self.goal = goal
-        self.move = move
-        self.depth = depth
-        self.expanded = False
-        self.scored = False
-
-    def expand(self, depthLimit):
-        if self.expanded:
-            return
-        self.expanded = True
-        if self.depth > depthLimit:
-            return
-
-        moves = self.state.generateMoves()
-        childGoal = 'min' if self.goal == 'max' else 'max'
-
-        for move in moves:
-            newState = self.state.applyMoveCloning(move)
-            if self.depth + 1 >= depthLimit:
-                self.children.append(node(newState, self, newState.heuristic(), childGoal, move, self.depth+1))
+        if tt is not None:
+            if best <= alphaOrig:
+                flag = UPPER
+            elif best >= betaOrig:
+                flag = LOWER
             else:
-                self.children.append(node(newState, self, None, childGoal, move, self.depth+1))
-
-    def scoreParent(self):
-        if not self.children or self.scored:
-            return
-        self.scored = True
-
-        if self.goal == 'max':
-            if self.children[0].score is None:
-                self.children[0].score = self.children[0].state.heuristic()
-            maxScore = self.children[0].score
-            for child in self.children:
-                if child.score is None:
-                    child.score = child.state.heuristic()
-                maxScore = max(maxScore, child.score)
-            self.score = maxScore
-        else:
-            if self.children[0].score is None:
-                self.children[0].score = self.children[0].state.heuristic()
-            minScore = self.children[0].score
-            for child in self.children:
-                if child.score is None:
-                    child.score = child.state.heuristic()
-                minScore = min(minScore, child.score)
-            self.score = minScore
+                flag = EXACT
+            tt.store(key, depth, flag, best, (bestMove.x, bestMove.y))
+
+        if root:
+            return best, bestMove
+        return best
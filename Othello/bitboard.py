@@ -0,0 +1,385 @@
+# Othello/bitboard.py
+# Bitboard implementation of the Othello State.
+# The board is held as two 64-bit integers, one per player, and square (x, y) is bit x*8 + y.
+# Move generation, flips and scoring are shift-and-mask operations instead of walks over a list of lists.
+# The public API matches Othello.othello.State so agents, mcts and the server can use either one.
+
+import random
+
+from Othello.othello import OthelloMove, EMPTY, PLAYER1, PLAYER2, PLAYER_NAMES, OTHER_PLAYER, positional_weights
+from Othello.zobrist import PIECE_KEYS, SIDE_KEY, FLIP_KEYS, zobrist_hash
+
+BOARD_SIZE = 8
+FULL = (1 << 64) - 1
+
+# bits with y == 0 and y == 7; shifting sideways must not wrap a piece onto the next row
+COL_FIRST = sum(1 << (x * BOARD_SIZE) for x in range(BOARD_SIZE))
+COL_LAST = COL_FIRST << (BOARD_SIZE - 1)
+NOT_COL_FIRST = FULL ^ COL_FIRST
+NOT_COL_LAST = FULL ^ COL_LAST
+
+# the 8 directions as (shift, mask applied after shifting)
+# x steps move 8 bits, y steps move 1 bit; left shifts are the directions with a positive offset
+SHIFTS_LEFT = [
+    (8, FULL),            # x+1
+    (1, NOT_COL_FIRST),   # y+1
+    (9, NOT_COL_FIRST),   # x+1, y+1
+    (7, NOT_COL_LAST),    # x+1, y-1
+]
+SHIFTS_RIGHT = [
+    (8, FULL),            # x-1
+    (1, NOT_COL_LAST),    # y-1
+    (9, NOT_COL_LAST),    # x-1, y-1
+    (7, NOT_COL_FIRST),   # x-1, y+1
+]
+
+
+# the four corner squares (0,0), (0,7), (7,0) and (7,7)
+CORNERS = (1 << 0) | (1 << (BOARD_SIZE - 1)) | (1 << (BOARD_SIZE * (BOARD_SIZE - 1))) | (1 << (BOARD_SIZE ** 2 - 1))
+
+
+# Returns a bitmask of the empty squares where 'own' may legally play against 'opp'
+def legal_moves_mask(own, opp):
+    empty = FULL ^ (own | opp)
+    moves = 0
+    for shift, mask in SHIFTS_LEFT:
+        o = opp & mask
+        x = (own << shift) & o
+        x |= (x << shift) & o
+        x |= (x << shift) & o
+        x |= (x << shift) & o
+        x |= (x << shift) & o
+        x |= (x << shift) & o
+        moves |= (x << shift) & mask & empty
+    for shift, mask in SHIFTS_RIGHT:
+        o = opp & mask
+        x = (own >> shift) & o
+        x |= (x >> shift) & o
+        x |= (x >> shift) & o
+        x |= (x >> shift) & o
+        x |= (x >> shift) & o
+        x |= (x >> shift) & o
+        moves |= (x >> shift) & mask & empty
+    return moves
+
+
+# Returns the bitmask of opponent pieces flipped when 'own' plays on square 'sq'
+def flips_mask(own, opp, sq):
+    flips = 0
+    start = 1 << sq
+    for shift, mask in SHIFTS_LEFT:
+        line = 0
+        x = (start << shift) & mask
+        while x & opp:
+            line |= x
+            x = (x << shift) & mask
+        if x & own:
+            flips |= line
+    for shift, mask in SHIFTS_RIGHT:
+        line = 0
+        x = (start >> shift) & mask
+        while x & opp:
+            line |= x
+            x = (x >> shift) & mask
+        if x & own:
+            flips |= line
+    return flips
+
+
+# per-square weights of State.heuristic() for incremental updates, see Othello.othello.positional_weights
+WEIGHTS = positional_weights(BOARD_SIZE)
+
+
+# (weight, mask of the squares with that weight) pairs for a table of per-square weights
+def _weight_terms(weights):
+    masks = {}
+    for sq, weight in enumerate(weights):
+        if weight:
+            masks[weight] = masks.get(weight, 0) | (1 << sq)
+    return tuple(masks.items())
+
+# PLAYER1 discs, PLAYER2 discs, and discs going from PLAYER2 to PLAYER1 (each gains its PLAYER1 weight and
+# loses its PLAYER2 weight)
+P1_TERMS = _weight_terms(WEIGHTS[PLAYER1])
+P2_TERMS = _weight_terms(WEIGHTS[PLAYER2])
+FLIP_TERMS = _weight_terms([w1 - w2 for w1, w2 in zip(WEIGHTS[PLAYER1], WEIGHTS[PLAYER2])])
+
+
+# Positional heuristic of State.heuristic(), computed with one popcount per distinct weight
+def positional_score(p1, p2):
+    score = 0
+    for weight, mask in P1_TERMS:
+        score += weight * (p1 & mask).bit_count()
+    for weight, mask in P2_TERMS:
+        score += weight * (p2 & mask).bit_count()
+    return score
+
+
+# Change of positional_score() when the discs in 'flips' go from PLAYER2 to PLAYER1
+# (negate it for PLAYER1 to PLAYER2)
+def flip_gain(flips):
+    gain = 0
+    for weight, mask in FLIP_TERMS:
+        gain += weight * (flips & mask).bit_count()
+    return gain
+
+
+class BitboardState:
+    __slots__ = ("pieces", "nextPlayerToMove", "_key", "_eval", "_moves")
+
+    boardSize = BOARD_SIZE
+
+    # board may be a list of lists as used by Othello.othello.State; only 8x8 boards are supported
+    def __init__(self, board = None, boardSize = BOARD_SIZE, nextPlayerToMove = PLAYER1):
+        if boardSize != BOARD_SIZE:
+            raise ValueError("BitboardState only supports 8x8 boards")
+        self.nextPlayerToMove = nextPlayerToMove
+        self._key = None
+        self._eval = None
+        self._moves = None
+        if board:
+            masks = [0, 0]
+            for i in range(BOARD_SIZE):
+                for j in range(BOARD_SIZE):
+                    if board[i][j] != EMPTY:
+                        masks[board[i][j]] |= 1 << (i * BOARD_SIZE + j)
+            self.pieces = masks
+        else:
+            # same initial position as Othello.othello.State
+            mid = BOARD_SIZE // 2
+            self.pieces = [
+                (1 << ((mid - 1) * BOARD_SIZE + mid - 1)) | (1 << (mid * BOARD_SIZE + mid)),
+                (1 << ((mid - 1) * BOARD_SIZE + mid)) | (1 << (mid * BOARD_SIZE + mid - 1)),
+            ]
+
+    @staticmethod
+    def _from_masks(p1, p2, nextPlayerToMove):
+        state = BitboardState.__new__(BitboardState)
+        state.pieces = [p1, p2]
+        state.nextPlayerToMove = nextPlayerToMove
+        state._key = None
+        state._eval = None
+        state._moves = None
+        return state
+
+    def __str__(self):
+        p1, p2 = self.pieces
+        output = ""
+        bit = 1
+        for i in range(BOARD_SIZE):
+            for j in range(BOARD_SIZE):
+                if p1 & bit:
+                    output += PLAYER_NAMES[PLAYER1] + " "
+                elif p2 & bit:
+                    output += PLAYER_NAMES[PLAYER2] + " "
+                else:
+                    output += PLAYER_NAMES[EMPTY] + " "
+                bit <<= 1
+            output += "\n"
+        return output
+
+    def __eq__(self, state):
+        return self.pack()[:2] == state.pack()[:2]
+
+    # list of lists view for code written against Othello.othello.State; built on demand
+    @property
+    def board(self):
+        return [[self.get(j, i) for j in range(BOARD_SIZE)] for i in range(BOARD_SIZE)]
+
+    def clone(self):
+        newState = BitboardState._from_masks(self.pieces[PLAYER1], self.pieces[PLAYER2], self.nextPlayerToMove)
+        newState._key = self._key
+        newState._eval = self._eval
+        if self._moves is not None:
+            newState._moves = list(self._moves)
+        return newState
+
+    # Zobrist hash, computed on first use and then kept up to date by applyMove
+    def hash_key(self):
+        if self._key is None:
+            self._key = zobrist_hash(self.pieces[PLAYER1], self.pieces[PLAYER2], self.nextPlayerToMove)
+        return self._key
+
+    def is_legal(self, x, y):
+        return x >= 0 and x < BOARD_SIZE and y >= 0 and y < BOARD_SIZE
+
+    def get(self, x, y):
+        if not self.is_legal(x, y):
+            return None
+        bit = 1 << (y * BOARD_SIZE + x)
+        if self.pieces[PLAYER1] & bit:
+            return PLAYER1
+        if self.pieces[PLAYER2] & bit:
+            return PLAYER2
+        return EMPTY
+
+    def row(self, y):
+        return self.board[y]
+
+    def num_empties(self):
+        return BOARD_SIZE * BOARD_SIZE - (self.pieces[PLAYER1] | self.pieces[PLAYER2]).bit_count()
+
+    def equals(self, state):
+        return self == state
+
+    def pack(self):
+        return self.pieces[PLAYER1], self.pieces[PLAYER2], self.nextPlayerToMove
+
+    @staticmethod
+    def from_packed(packed, boardSize = BOARD_SIZE):
+        if boardSize != BOARD_SIZE:
+            raise ValueError("BitboardState only supports 8x8 boards")
+        return BitboardState._from_masks(*packed)
+
+    # bitmask of the legal moves for 'player'
+    def moves_mask(self, player = None):
+        if player is None:
+            player = self.nextPlayerToMove
+        return legal_moves_mask(self.pieces[player], self.pieces[OTHER_PLAYER[player]])
+
+    def game_over(self):
+        p1, p2 = self.pieces
+        return legal_moves_mask(p1, p2) == 0 and legal_moves_mask(p2, p1) == 0
+
+    def score(self):
+        return self.pieces[PLAYER1].bit_count() - self.pieces[PLAYER2].bit_count()
+
+    # computed on first use and then updated by applyMove, like the Zobrist hash
+    def heuristic(self):
+        if self._eval is None:
+            self._eval = positional_score(self.pieces[PLAYER1], self.pieces[PLAYER2])
+        return self._eval
+
+    # the list is the caller's to modify; see legalMoves() for the shared cached one
+    def generateMoves(self, player = None):
+        return list(self.legalMoves(player))
+
+    # Legal moves for 'player', built once per position and side like State.legalMoves(); must not be modified
+    def legalMoves(self, player = None):
+        if player is None:
+            player = self.nextPlayerToMove
+        cache = self._moves
+        if cache is None:
+            cache = self._moves = [None, None, None, None]   # moves of PLAYER1, PLAYER2, then their strings
+        moves = cache[player]
+        if moves is None:
+            moves = cache[player] = self.scanMoves(player)
+        return moves
+
+    def moveStrings(self, player = None):
+        if player is None:
+            player = self.nextPlayerToMove
+        moves = self.legalMoves(player)
+        strings = self._moves[2 + player]
+        if strings is None:
+            strings = self._moves[2 + player] = [str(m) for m in moves]
+        return strings
+
+    # moves come out in ascending square order, the same order the list-based State produces
+    def scanMoves(self, player):
+        mask = legal_moves_mask(self.pieces[player], self.pieces[OTHER_PLAYER[player]])
+        moves = []
+        while mask:
+            low = mask & -mask
+            sq = low.bit_length() - 1
+            moves.append(OthelloMove(player, sq >> 3, sq & 7))
+            mask ^= low
+        return moves
+
+    def applyMove(self, move):
+        if move is None:
+            print("\nPlayer " + PLAYER_NAMES[self.nextPlayerToMove] + " passes the move!")
+        self.make_move(move)
+
+    # In-place move for search; returns the undo record (placed bit, flipped mask, previous side to move,
+    # previous hash, previous heuristic) for unmake_move. move may be None for a pass; nothing is printed
+    def make_move(self, move):
+        previousPlayer = self.nextPlayerToMove
+        previousKey = self._key
+        previousEval = self._eval
+        self.nextPlayerToMove = OTHER_PLAYER[previousPlayer]
+        if move is None:
+            if previousKey is not None:
+                self._key = previousKey ^ SIDE_KEY
+            return (0, 0, previousPlayer, previousKey, previousEval) #player passes
+
+        player = move.player
+        other = OTHER_PLAYER[player]
+        sq = move.x * BOARD_SIZE + move.y
+        placed = 1 << sq
+        pieces = self.pieces
+        self._moves = None
+        flips = flips_mask(pieces[player], pieces[other], sq)
+        pieces[player] |= flips | placed
+        pieces[other] &= ~flips
+
+        if previousKey is not None:
+            key = previousKey ^ SIDE_KEY ^ PIECE_KEYS[player][sq]
+            f = flips
+            while f:
+                low = f & -f
+                key ^= FLIP_KEYS[low.bit_length() - 1]
+                f ^= low
+            self._key = key
+        if previousEval is not None:
+            gain = flip_gain(flips)
+            self._eval = previousEval + WEIGHTS[player][sq] + (gain if player == PLAYER1 else -gain)
+        return (placed, flips, previousPlayer, previousKey, previousEval)
+
+    def unmake_move(self, undo):
+        placed, flips, previousPlayer, previousKey, previousEval = undo
+        if placed:
+            # the mover is the player whose mask holds the placed disc
+            player = PLAYER1 if self.pieces[PLAYER1] & placed else PLAYER2
+            self.pieces[player] ^= flips | placed
+            self.pieces[OTHER_PLAYER[player]] |= flips
+            self._moves = None
+        self.nextPlayerToMove = previousPlayer
+        self._key = previousKey
+        self._eval = previousEval
+
+    # Random playout in place for MCTS, same contract as State.rollout: random legal moves until neither side
+    # can move (a side without a move passes), no printing, final score() returned
+    # the two masks are kept in locals as (mover, opponent) and only written back at the end
+    def rollout(self, rng = random):
+        player = self.nextPlayerToMove
+        own = self.pieces[player]
+        opp = self.pieces[OTHER_PLAYER[player]]
+        passed = False
+        while True:
+            moves = legal_moves_mask(own, opp)
+            if moves:
+                passed = False
+                # drop a random number of low bits to pick one of the legal squares uniformly
+                for k in range(rng.randrange(moves.bit_count())):
+                    moves &= moves - 1
+                placed = moves & -moves
+                flips = flips_mask(own, opp, placed.bit_length() - 1)
+                own |= flips | placed
+                opp ^= flips
+            elif passed:
+                break
+            else:
+                passed = True
+            own, opp = opp, own
+            player = OTHER_PLAYER[player]
+        self.pieces[player] = own
+        self.pieces[OTHER_PLAYER[player]] = opp
+        self.nextPlayerToMove = player
+        self._key = None
+        self._eval = None
+        self._moves = None
+        return self.score()
+
+    def applyMoveCloning(self, move):
+        newState = self.clone()
+        newState.applyMove(move)
+        return newState
+
+    def winner(self):
+        if self.score() > 0:
+            return PLAYER_NAMES[PLAYER1]
+        elif self.score() < 0:
+            return PLAYER_NAMES[PLAYER2]
+        else:
+            return "DRAW"
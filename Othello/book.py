@@ -0,0 +1,158 @@
+# Othello/book.py
+# Opening book: precomputed replies for the positions that start every game.
+# The file is a small header followed by fixed-size (key, x, y) records sorted by key, where key is the position's
+# Zobrist hash (State.hash_key(), which includes the side to move). It is memory-mapped and searched by bisection,
+# so loading it reads nothing up front and every server process shares the same pages.
+#
+# Build one offline with deep AlphaBeta searches:
+#   python -m Othello.book --out book.bin --plies 6 --depth 8
+
+import argparse
+import contextlib
+import io
+import mmap
+import os
+import struct
+import sys
+import time
+
+from Othello.othello import PLAYER1, PLAYER2
+from Othello.bitboard import BitboardState
+from Othello.agent import AlphaBeta
+from Othello.evaluation import EVALUATORS, make_evaluator
+
+BOOK_MAGIC = b"QGPB"
+BOOK_VERSION = 1
+HEADER = struct.Struct("!4sBI")     # magic, version, record count
+RECORD = struct.Struct("!QBB")      # position hash, x, y
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is not an opening book")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not an opening book (version {BOOK_VERSION})")
+        if HEADER.size + count * RECORD.size > len(self._map):
+            self._map.close()
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        return f"{self.path} ({self.count} positions)"
+
+    # (x, y) stored for the position hash 'key', or None
+    def find(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            found, x, y = RECORD.unpack_from(self._map, HEADER.size + lo * RECORD.size)
+            if found == key:
+                return x, y
+        return None
+
+    # Book move for state as one of its generateMoves(), or None when the position is not in the book
+    # the stored square is checked against the legal moves, so a hash collision cannot produce an illegal move
+    def lookup(self, state):
+        found = self.find(state.hash_key())
+        if found is not None:
+            for move in state.generateMoves():
+                if move.x == found[0] and move.y == found[1]:
+                    self.hits += 1
+                    return move
+        self.misses += 1
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    # agents carrying a book are pickled for process-pool workers; the worker maps the same file again
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+
+# Writes entries ({key: (x, y)}) as a book file
+def write_book(path, entries):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(entries)))
+        for key in sorted(entries):
+            x, y = entries[key]
+            f.write(RECORD.pack(key, x, y))
+
+
+# Searches every position reachable in fewer than 'plies' moves from the start with an AlphaBeta of
+# 'depth' plies (or moveTimeMs per position) and returns {position hash: (x, y)} of the replies
+def build_book(plies, depth, moveTimeMs = None, evaluator = "positional", progress = None):
+    agents = {}
+    for player, name in ((PLAYER1, 'Player 1'), (PLAYER2, 'Player 2')):
+        agent = AlphaBeta(depth, moveTimeMs=moveTimeMs, evaluator=make_evaluator(evaluator))
+        agent.id = name
+        agents[player] = agent
+
+    entries = {}
+    frontier = [BitboardState()]
+    for ply in range(plies):
+        following = []
+        for state in frontier:
+            key = state.hash_key()
+            if key in entries:
+                continue
+            moves = state.generateMoves()
+            if not moves:
+                continue
+            # the searches print their timing; a build of thousands of positions only reports progress
+            with contextlib.redirect_stdout(io.StringIO()):
+                move = agents[state.nextPlayerToMove].choose_move(state)
+            entries[key] = (move.x, move.y)
+            for move in moves:
+                following.append(state.applyMoveCloning(move))
+        frontier = following
+        if progress is not None:
+            progress(ply, len(entries))
+    return entries
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Build an Othello opening book")
+    parser.add_argument("--out", "-o", required=True, help="Book file to write")
+    parser.add_argument("--plies", type=int, default=6,
+                        help="Cover every position reachable in fewer than this many moves (default: 6)")
+    parser.add_argument("--depth", type=int, default=8, help="AlphaBeta search depth per position (default: 8)")
+    parser.add_argument("--move-ms", type=int, default=None,
+                        help="Search each position for this long instead of to a fixed depth")
+    parser.add_argument("--eval", choices=sorted(EVALUATORS), default="positional",
+                        help="Evaluation function for the searches (default: positional)")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+
+    def progress(ply, count):
+        print(f"ply {ply + 1}/{args.plies}: {count} positions, {time.time() - start:.1f}s", flush=True)
+
+    entries = build_book(args.plies, args.depth if args.move_ms is None else 64, args.move_ms, args.eval, progress)
+    write_book(args.out, entries)
+    print(f"wrote {len(entries)} positions to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# Othello/endgame.py
+# Exact endgame solver.
+# With few empty squares left the whole remaining game can be searched, so the result is the true final disc
+# difference rather than a heuristic guess. The search works on the two bitboards directly (side to move first,
+# negamax), orders moves by region parity and opponent mobility, and keeps its own small transposition table.
+
+import time
+
+from Othello.bitboard import FULL, legal_moves_mask, flips_mask
+from Othello.transposition import TranspositionTable, EXACT, LOWER, UPPER, FLAG, SCORE, MOVE
+
+ENDGAME_TT_BUCKETS = 1 << 12
+
+# positions with fewer empties than this are not worth a table lookup
+TT_MIN_EMPTIES = 6
+
+# with more empties than this, moves that leave the opponent fewest replies go first ("fastest first");
+# below it the mobility count costs more than it saves and only parity is used
+FASTEST_FIRST_EMPTIES = 5
+
+# disc differences lie in -64..64
+SCORE_LIMIT = 65
+
+# a solve with a deadline looks at the clock once every this many nodes (must be a power of two)
+TIME_CHECK_INTERVAL = 1024
+
+
+# raised inside solve() when its deadline passes; nothing is returned for the unfinished search
+class SolverTimeout(Exception):
+    pass
+
+
+def _quadrant_masks():
+    masks = [0, 0, 0, 0]
+    for sq in range(64):
+        x, y = sq >> 3, sq & 7
+        masks[(x >= 4) * 2 + (y >= 4)] |= 1 << sq
+    return masks
+
+QUADRANTS = _quadrant_masks()
+SQUARE_QUADRANT = [QUADRANTS[((sq >> 3) >= 4) * 2 + ((sq & 7) >= 4)] for sq in range(64)]
+
+
+class EndgameSolver:
+    def __init__(self, ttBuckets = ENDGAME_TT_BUCKETS):
+        self.tt = TranspositionTable(ttBuckets)
+        self.nodes = 0
+        self.deadline = None
+
+    # Best move for the side owning 'own' with 'opp' to reply: returns (score, square) where score is the final
+    # disc difference for the side to move under perfect play and square is x*8 + y (None if it must pass)
+    # wld=True only decides win / draw / loss (score then has the sign of the result), which is much faster
+    # deadline is a time.time() value; the search raises SolverTimeout once it passes
+    def solve(self, own, opp, wld = False, deadline = None):
+        self.tt.new_search()
+        self.nodes = 0
+        self.deadline = deadline
+        try:
+            if wld:
+                return self.search(own, opp, -1, 1, False, True)
+            return self.search(own, opp, -SCORE_LIMIT, SCORE_LIMIT, False, True)
+        finally:
+            self.deadline = None
+
+    # Negamax alpha-beta to the end of the game; 'passed' is set when the opponent just passed
+    def search(self, own, opp, alpha, beta, passed = False, root = False):
+        self.nodes += 1
+        if self.deadline is not None and not (self.nodes & (TIME_CHECK_INTERVAL - 1)):
+            if time.time() >= self.deadline:
+                raise SolverTimeout()
+        moves = legal_moves_mask(own, opp)
+        if not moves:
+            if passed:
+                # neither side can move: game over
+                score = own.bit_count() - opp.bit_count()
+            else:
+                score = -self.search(opp, own, -beta, -alpha, True)
+            return (score, None) if root else score
+
+        empty = FULL ^ (own | opp)
+        empties = empty.bit_count()
+        tt = self.tt if empties >= TT_MIN_EMPTIES else None
+        ttMove = None
+        if tt is not None:
+            key = (own << 64) | opp
+            entry = tt.probe(key)
+            if entry is not None:
+                if not root:
+                    score = entry[SCORE]
+                    if entry[FLAG] == EXACT:
+                        return score
+                    if entry[FLAG] == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score
+                ttMove = entry[MOVE]
+        alphaOrig = alpha
+
+        best = -SCORE_LIMIT
+        bestSquare = None
+        for sq in self.orderMoves(own, opp, moves, empty, empties, ttMove):
+            placed = 1 << sq
+            flips = flips_mask(own, opp, sq)
+            score = -self.search(opp ^ flips, own | flips | placed, -beta, -alpha)
+            if score > best:
+                best, bestSquare = score, sq
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+
+        if tt is not None:
+            if best <= alphaOrig:
+                flag = UPPER
+            elif best >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            tt.store(key, empties, flag, best, bestSquare)
+        return (best, bestSquare) if root else best
+
+    # Squares of 'moves' in search order: the table move, then moves into regions with an odd number of
+    # empties (the side that moves last in a region tends to keep it), then by opponent mobility
+    def orderMoves(self, own, opp, moves, empty, empties, ttMove):
+        squares = []
+        while moves:
+            low = moves & -moves
+            squares.append(low.bit_length() - 1)
+            moves ^= low
+        if len(squares) == 1:
+            return squares
+
+        fastest = empties > FASTEST_FIRST_EMPTIES
+
+        def rank(sq):
+            if sq == ttMove:
+                return -1000
+            value = 0 if (empty & SQUARE_QUADRANT[sq]).bit_count() & 1 else 100
+            if fastest:
+                placed = 1 << sq
+                flips = flips_mask(own, opp, sq)
+                value += legal_moves_mask(opp ^ flips, own | flips | placed).bit_count()
+            return value
+
+        squares.sort(key=rank)
+        return squares
@@ -0,0 +1,99 @@
+# Othello/evaluation.py
+# Evaluation functions for the searching agents.
+# An evaluator scores a position from PLAYER1's point of view, like State.heuristic(): PLAYER1 maximizes the
+# value and PLAYER2 minimizes it. MinimaxAgent and AlphaBeta take one as their 'evaluator' parameter and the
+# server picks one by name with --ai-eval.
+
+from Othello.othello import PLAYER2
+from Othello.bitboard import (FULL, CORNERS, NOT_COL_FIRST, NOT_COL_LAST, COL_FIRST, COL_LAST,
+                              legal_moves_mask)
+
+# the four edges as bitmasks (x is the row, so rows 0 and 7 are the first and last 8 bits)
+ROW_FIRST = 0xFF
+ROW_LAST = ROW_FIRST << 56
+EDGE_LINES = ((ROW_FIRST, 1), (ROW_LAST, 1), (COL_FIRST, 8), (COL_LAST, 8))
+
+
+# Base class: evaluate(state) returns the score of state, higher is better for PLAYER1
+class Evaluator:
+    name = ""
+
+    def evaluate(self, state):
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.name
+
+
+# The original positional table (State.heuristic()), kept up to date incrementally by make/unmake
+class PositionalEvaluator(Evaluator):
+    name = "positional"
+
+    def evaluate(self, state):
+        return state.heuristic()
+
+
+# Bitmask of the squares next to at least one square of 'mask' (8-neighbourhood, no wrap-around)
+def neighbours(mask):
+    sideways = ((mask << 1) & NOT_COL_FIRST) | ((mask >> 1) & NOT_COL_LAST)
+    row = mask | sideways
+    return (sideways | (row << 8) | (row >> 8)) & FULL
+
+
+# Discs of 'own' that can never be flipped because they are joined to an owned corner along an edge
+def edge_stable(own):
+    stable = own & CORNERS
+    if not stable:
+        return 0
+    for line, step in EDGE_LINES:
+        lineOwn = own & line
+        grown = stable & line
+        while True:
+            more = ((grown << step) | (grown >> step)) & lineOwn
+            if not more & ~grown:
+                break
+            grown |= more
+        stable |= grown
+    return stable
+
+
+# Weighted sum of features computed on bitboards; 8x8 boards only
+#   mobility  - legal moves of PLAYER1 minus those of PLAYER2
+#   frontier  - discs next to an empty square, which give the opponent moves; counts against their owner
+#   corners   - corner discs
+#   stability - discs anchored to an owned corner along an edge, which can no longer be flipped
+#   parity    - +1 if the side to move would get the last move of the game as things stand, else -1
+class WeightedEvaluator(Evaluator):
+    name = "weighted"
+
+    def __init__(self, mobility = 5, frontier = 3, corners = 30, stability = 10, parity = 5):
+        self.mobility = mobility
+        self.frontier = frontier
+        self.corners = corners
+        self.stability = stability
+        self.parity = parity
+
+    def evaluate(self, state):
+        p1, p2, side = state.pack()
+        empty = FULL ^ (p1 | p2)
+
+        mobility = legal_moves_mask(p1, p2).bit_count() - legal_moves_mask(p2, p1).bit_count()
+        nearEmpty = neighbours(empty)
+        frontier = (p2 & nearEmpty).bit_count() - (p1 & nearEmpty).bit_count()
+        corners = (p1 & CORNERS).bit_count() - (p2 & CORNERS).bit_count()
+        stability = edge_stable(p1).bit_count() - edge_stable(p2).bit_count()
+        parity = 1 if empty.bit_count() & 1 else -1
+        if side == PLAYER2:
+            parity = -parity
+
+        return (self.mobility * mobility + self.frontier * frontier + self.corners * corners
+                + self.stability * stability + self.parity * parity)
+
+
+EVALUATORS = {"positional": PositionalEvaluator, "weighted": WeightedEvaluator}
+
+
+def make_evaluator(name):
+    if name not in EVALUATORS:
+        raise ValueError(f"Unknown evaluator {name!r}, expected one of {sorted(EVALUATORS)}")
+    return EVALUATORS[name]()
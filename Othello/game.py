@@ -30,13 +30,14 @@ class Game:
         print(state)
         return state  # return final state or list of states as needed
 
+    # playout for MCTS: one copy of the initial state, then every move is applied in place
     def playMCTS(self):
         state = self.initial_state.clone()
         player_index = 0
         while not state.game_over():
             player = self.players[player_index]
             move = player.choose_move(state)
-            state = state.applyMoveCloning(move)
+            state.applyMove(move)
             player_index = (player_index + 1) % len(self.players)
             if abs(state.heuristic()) > 50:
                 return state
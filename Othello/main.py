@@ -8,7 +8,14 @@ import os
 import time
 import csv
 
-def create_player(arg, depth_or_time):
+# playerId ('Player 1' / 'Player 2') is the slot the player fills; searching agents play for that side
+def create_player(arg, depth_or_time, playerId = None):
+    player = make_player(arg, depth_or_time)
+    if playerId is not None and hasattr(player, 'id'):
+        player.id = playerId
+    return player
+
+def make_player(arg, depth_or_time):
     if arg == 'human':
         return agent.HumanPlayer()
     elif arg == 'random':
@@ -17,6 +24,9 @@ def create_player(arg, depth_or_time):
         return agent.MinimaxAgent(depth_or_time)
     elif arg == 'alphabeta':
         return agent.AlphaBeta(depth_or_time)
+    elif arg in ('mcts-root', 'mcts-leaf'):
+        # parallel MCTS over every core, depth_or_time iterations per tree
+        return mcts.mcts(depth_or_time, workers=os.cpu_count(), parallel=arg.split('-')[1])
     elif check_pattern(arg) or arg == 'mcts':
         if not os.path.exists(arg + ".py"):
             print("The agent is not defined in the system!")
@@ -45,8 +55,8 @@ if __name__ == '__main__':
     if len(sys.argv) == 4:
         depth_or_time = int(sys.argv[3])
 
-    player1 = create_player(get_arg(1), depth_or_time)
-    player2 = create_player(get_arg(2), depth_or_time)
+    player1 = create_player(get_arg(1), depth_or_time, 'Player 1')
+    player2 = create_player(get_arg(2), depth_or_time, 'Player 2')
 
     # Or for a built‐in test:
     # player1 = agent.RandomAgent()
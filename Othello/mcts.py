@@ -1,34 +1,88 @@
 # Othello/mcts.py
 
 import math
+import multiprocessing
 import random
 import sys
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 
 # Instead of "import game", "import agent", force package imports:
-from Othello.game  import Game, Player
-from Othello.agent import RandomAgent
+from Othello.game  import Player
 
 TIMER = False
 
+# ways of spreading one search over worker processes:
+#   root - every worker grows its own tree from the current position; visits and wins of the root moves are summed
+#   leaf - one tree in this process; selected leaves are collected in batches and their rollouts run on the workers
+PARALLEL_MODES = ("root", "leaf")
+
+# leaf positions sent to a worker in one task in leaf-parallel mode
+LEAF_BATCH = 8
+
+# default cap on the nodes of a kept tree; once reached, iterations simulate without expanding
+MAX_TREE_NODES = 200000
+
+# positions remembered by the explored-state table
+EXPLORED_CAPACITY = 1 << 18
+
+
+#entry point of a root-parallel worker: grows one tree for the packed position and returns
+#(x, y, visits, wins) for every root move plus the number of iterations run
+def _search_tree(agent, stateClass, packed, boardSize, seed):
+    random.seed(seed)
+    state = stateClass.from_packed(packed, boardSize)
+    agent.state = state.clone()
+    agent.root = agent.createNode(state, None, [], None, 0, 0, 0, agent.id == 'Player 1')
+    agent.nodes = 1
+    iterations = agent.runIterations(hashTable())
+    stats = [(child.action.x, child.action.y, child.used, child.score) for child in agent.root.children]
+    return stats, iterations
+
+
+#entry point of a leaf-parallel worker: one random playout per packed position
+def _rollouts(stateClass, boardSize, positions):
+    return [stateClass.from_packed(packed, boardSize).rollout() for packed in positions]
+
+
 class mcts(Player):
-    def __init__(self, timer):
+    # timer is the number of iterations per move, or milliseconds when TIMER is set; moveTimeMs gives a time
+    # budget regardless of TIMER. workers > 0 runs the search in that many processes, split as 'parallel'
+    # reuseTree keeps the tree between moves and continues from the node of the new position; maxNodes caps its size
+    def __init__(self, timer, workers = 0, parallel = "root", moveTimeMs = None, reuseTree = True,
+                 maxNodes = MAX_TREE_NODES):
         super().__init__()
+        if parallel not in PARALLEL_MODES:
+            raise ValueError(f"Unknown MCTS parallel mode {parallel!r}, expected one of {PARALLEL_MODES}")
         self.timer = timer
+        self.moveTimeMs = moveTimeMs if moveTimeMs else (timer if TIMER else None)
+        self.workers = max(0, workers)
+        self.parallel = parallel
+        self._executor = None
+        self.reuseTree = reuseTree
+        self.maxNodes = maxNodes
+        self.root = None
+        self.explored = None
+        self.nodes = 0
         self.id = ""
         self.startTime = time.time()*1000
         self.totalTime = time.time()*1000 - self.startTime
 
-        if len(sys.argv) > 1 and sys.argv[1] == "mcts":
+        # main.py's create_player sets the id from the slot; this default covers mcts, mcts-root and mcts-leaf
+        if len(sys.argv) > 1 and sys.argv[1].startswith("mcts"):
             self.id = 'Player 1'
         else:
             self.id = 'Player 2'
 
     def choose_move(self, state):
         self.startTime = time.time()*1000
+        # the tree is walked by making and unmaking moves on this one copy of the position
+        self.state = state.clone()
         corners = []
         if self.id == 'Player 1':
-            self.root = self.createNode(state, None, [], None, 0, 0, 0, True)
+            self.setRoot(state, True)
             corners.extend([
                 f"Player O to 0,0",
                 f"Player O to 7,7",
@@ -36,7 +90,7 @@ class mcts(Player):
                 f"Player O to 7,0"
             ])
         else:
-            self.root = self.createNode(state, None, [], None, 0, 0, 0, False)
+            self.setRoot(state, False)
             corners.extend([
                 f"Player X to 0,0",
                 f"Player X to 7,7",
@@ -44,47 +98,178 @@ class mcts(Player):
                 f"Player X to 7,0"
             ])
 
-        exploredStates = hashTable()
+        exploredStates = self.explored
         self.totalTime = 0
         iterations = 0
 
-        if len(self.root.movesRemaining) < 1:
+        # a kept root has already expanded some of its moves, so its movesRemaining is not the full list
+        moves = state.generateMoves()
+        if len(moves) < 1:
             return None
-        if len(self.root.movesRemaining) == 1:
-            return self.root.movesRemaining[0]
+        if len(moves) == 1:
+            return moves[0]
 
         # If any corner is available, take it immediately
-        for legalMove in self.root.movesRemaining:
+        for legalMove in moves:
             if str(legalMove) in corners:
                 self.totalTime = time.time() - (self.startTime/1000)
                 print(f"Total Iterations = 0")
                 print(f"Total Time = {self.totalTime} seconds")
                 return legalMove
 
-        if TIMER:
-            while (self.totalTime < self.timer - 100):
-                iterations += 1
-                node = self.treePolicy(self.root, exploredStates)
-                if node is not None:
-                    node2 = self.defaultPolicy(node)
-                    Node2Score = self.score(node2)
-                    self.backup(node, Node2Score)
-                self.totalTime = time.time()*1000 - self.startTime
+        if self.workers > 0 and self.parallel == "root":
+            selection, iterations = self.rootParallel(state)
+        else:
+            if self.workers > 0:
+                iterations = self.leafParallel(exploredStates)
+            else:
+                iterations = self.runIterations(exploredStates)
             selection = self.bestChild(self.root).action
+
+        self.totalTime = time.time() - (self.startTime/1000)
+        if self.moveTimeMs:
             print(f"Total Iterations = {iterations}")
-            return selection
+        else:
+            print(f"Total Time = {self.totalTime} seconds")
+        return selection
+
+    # Makes the node for 'state' the root: the previous tree's node for it when it can be found
+    # (the subtrees of the other moves are dropped with the old root), otherwise a new tree with an
+    # empty explored-state table
+    def setRoot(self, state, maximizer):
+        root = self.findRoot(state, maximizer)
+        if root is None:
+            self.root = self.createNode(state, None, [], None, 0, 0, 0, maximizer)
+            self.explored = hashTable()
+            self.nodes = 1
+        else:
+            root.parent = None
+            self.root = root
+            self.nodes = root.countNodes()
+
+    # Looks for the position among the previous root's children and grandchildren, i.e. after the opponent's
+    # reply to our last move or after a move of our own made outside this agent
+    # root-parallel trees live in the workers, so there is nothing to keep
+    def findRoot(self, state, maximizer):
+        if not self.reuseTree or self.root is None or (self.workers > 0 and self.parallel == "root"):
+            return None
+        key = state.hash_key()
+        for child in self.root.children:
+            if child.key == key and child.maximizer == maximizer:
+                return child
+        for child in self.root.children:
+            for grandchild in child.children:
+                if grandchild.key == key and grandchild.maximizer == maximizer:
+                    return grandchild
+        return None
 
-        while iterations < self.timer:
+    # whether the move budget allows more iterations; a time budget keeps 100 ms in hand
+    def budgetLeft(self, iterations):
+        if self.moveTimeMs:
+            return time.time()*1000 - self.startTime < self.moveTimeMs - 100
+        return iterations < self.timer
+
+    # serial search: iterations on this process until the budget runs out; returns the iteration count
+    def runIterations(self, exploredStates):
+        iterations = 0
+        while self.budgetLeft(iterations):
             iterations += 1
-            node = self.treePolicy(self.root, exploredStates)
-            if node is not None:
-                node2 = self.defaultPolicy(node)
-                Node2Score = self.score(node2)
-                self.backup(node, Node2Score)
-            self.totalTime = time.time() - (self.startTime/1000)
-        selection = self.bestChild(self.root).action
-        print(f"Total Time = {self.totalTime} seconds")
-        return selection
+            self.iterate(exploredStates)
+        return iterations
+
+    def getExecutor(self):
+        if self._executor is None:
+            # spawn, not fork: a forked worker would inherit the server's sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # the process pool stays with the agent that created it; a pickled copy (e.g. one sent to a
+    # worker) searches serially
+    def __getstate__(self):
+        attributes = self.__dict__.copy()
+        attributes["_executor"] = None
+        attributes["workers"] = 0
+        attributes["root"] = None
+        attributes["explored"] = None
+        attributes.pop("state", None)
+        return attributes
+
+    # Root parallelism: one independent tree per worker, each with the full move budget
+    # the root moves' visits and wins are summed over the trees and the most visited move is played
+    def rootParallel(self, state):
+        executor = self.getExecutor()
+        packed = state.pack()
+        futures = [executor.submit(_search_tree, self, type(state), packed, state.boardSize,
+                                   random.getrandbits(32)) for w in range(self.workers)]
+        visits = {}
+        wins = {}
+        iterations = 0
+        for future in futures:
+            stats, count = future.result()
+            iterations += count
+            for x, y, used, score in stats:
+                visits[(x, y)] = visits.get((x, y), 0) + used
+                wins[(x, y)] = wins.get((x, y), 0) + score
+        for move in self.root.movesRemaining:
+            key = (move.x, move.y)
+            if key in visits:
+                self.root.children.append(self.createNode(state.applyMoveCloning(move), self.root, [], move,
+                                                          visits[key], wins[key], 0, not self.root.maximizer))
+        best = max(self.root.children, key=lambda child: (child.used, child.score))
+        self.root.used = iterations
+        return best.action, iterations
+
+    # Leaf parallelism: selects workers * LEAF_BATCH leaves from the one tree, marking each path with a
+    # virtual loss (a visit without a win) so the following selections spread over other branches, then
+    # plays the leaves out on the workers and backs the real results up in place of the virtual losses
+    def leafParallel(self, exploredStates):
+        executor = self.getExecutor()
+        stateClass = type(self.state)
+        iterations = 0
+        while self.budgetLeft(iterations):
+            batch = self.workers * LEAF_BATCH
+            if not self.moveTimeMs:
+                batch = min(batch, self.timer - iterations)
+            leaves = []
+            positions = []
+            for i in range(batch):
+                path = []
+                leaf = self.treePolicy(self.root, exploredStates, path)
+                positions.append(self.state.pack())
+                while path:
+                    self.state.unmake_move(path.pop())
+                self.virtualLoss(leaf, 1)
+                leaves.append(leaf)
+            chunks = [positions[i:i + LEAF_BATCH] for i in range(0, len(positions), LEAF_BATCH)]
+            scores = chain.from_iterable(
+                executor.map(_rollouts, repeat(stateClass), repeat(self.state.boardSize), chunks))
+            for leaf, score in zip(leaves, scores):
+                self.virtualLoss(leaf, -1)
+                self.backup(leaf, score)
+            iterations += batch
+        return iterations
+
+    def virtualLoss(self, node, visits):
+        while node is not None:
+            node.used += visits
+            node = node.parent
+
+    # one selection / expansion / simulation / backup pass
+    # treePolicy leaves self.state at the selected node; the moves it made are taken back afterwards
+    def iterate(self, exploredStates):
+        path = []
+        node = self.treePolicy(self.root, exploredStates, path)
+        if node is not None:
+            self.backup(node, self.defaultPolicy(node))
+        while path:
+            self.state.unmake_move(path.pop())
 
     def createNode(self, state, parent, children, action, used, score, value, maximizer):
         return node(state, parent, children, action, used, score, value, maximizer)
@@ -99,36 +284,38 @@ class mcts(Player):
                 maxChild = child
         return maxChild
 
-    def treePolicy(self, currentNode, exploredStates):
-        if len(currentNode.state.generateMoves()) < 1:
-            return currentNode
+    # Descends from currentNode, which must match self.state, to the node to simulate from and
+    # leaves self.state at that node; every move made on the way is appended to path as an undo record
+    def treePolicy(self, currentNode, exploredStates, path):
+        state = self.state
+        while True:
+            # no legal move here: simulate from this node
+            if not currentNode.movesRemaining and not currentNode.children:
+                return currentNode
+            # tree is full: simulate from here without expanding
+            if currentNode.movesRemaining and self.nodes >= self.maxNodes:
+                return currentNode
 
-        while len(currentNode.movesRemaining) > 0:
-            move = random.choice(currentNode.movesRemaining)
-            newState = currentNode.state.applyMoveCloning(move)
-            currentNode.movesRemaining.remove(move)
-            newNode = node(newState, currentNode, [], move, 0, 0, 0, currentNode.setChildGoal(currentNode.maximizer))
-            currentNode.children.append(newNode)
-            if not exploredStates.statePresent(newState):
-                exploredStates.add(newState)
-                return newNode
+            while len(currentNode.movesRemaining) > 0:
+                move = random.choice(currentNode.movesRemaining)
+                undo = state.make_move(move)
+                currentNode.movesRemaining.remove(move)
+                newNode = node(state, currentNode, [], move, 0, 0, 0, currentNode.setChildGoal(currentNode.maximizer))
+                currentNode.children.append(newNode)
+                self.nodes += 1
+                if not exploredStates.statePresent(state):
+                    exploredStates.add(state)
+                    path.append(undo)
+                    return newNode
+                state.unmake_move(undo)
 
-        return self.treePolicy(self.bestChild(currentNode), exploredStates)
+            currentNode = self.bestChild(currentNode)
+            path.append(state.make_move(currentNode.action))
 
+    # plays the position in self.state out to the end with random moves and returns the final score;
+    # currentNode is the node it belongs to. The playout runs on a copy so the tree walk can be unwound
     def defaultPolicy(self, currentNode):
-        tempPlayer1 = RandomAgent()
-        tempPlayer2 = RandomAgent()
-        # Silence the console while playing out
-        backup_stdout = sys.stdout
-        sys.stdout = open(os.devnull, 'w')
-        tempGame = Game(currentNode.state, tempPlayer1, tempPlayer2)
-        finalState = tempGame.playMCTS()
-        sys.stdout.close()
-        sys.stdout = backup_stdout
-        return finalState
-
-    def score(self, state):
-        return state.score()
+        return self.state.clone().rollout()
 
     def backup(self, node, score):
         node.used += 1
@@ -146,9 +333,9 @@ class mcts(Player):
             self.backup(node.parent, score)
 
 
+# tree nodes do not keep a copy of their position; 'state' is only read for the legal moves and the hash
 class node:
     def __init__(self, state, parent, children, action, used, score, value, maximizer):
-        self.state = state
         self.parent = parent
         self.children = children
         self.action = action
@@ -157,6 +344,17 @@ class node:
         self.value = value
         self.maximizer = maximizer
         self.movesRemaining = state.generateMoves()
+        # position hash, used to find this node again when the tree is kept for the next move
+        self.key = state.hash_key()
+
+    def countNodes(self):
+        count = 0
+        stack = [self]
+        while stack:
+            current = stack.pop()
+            count += 1
+            stack.extend(current.children)
+        return count
 
     def findValue(self):
         if self.used != 0:
@@ -170,35 +368,25 @@ class node:
         return not parentGoal
 
 
+# Set of explored positions, keyed by the position's Zobrist hash (State.hash_key(), kept up to date by
+# make_move) so membership is one set lookup; holds at most 'capacity' keys and forgets the oldest first
 class hashTable:
-    def __init__(self):
-        self.hashMap = dict()
+    def __init__(self, capacity = EXPLORED_CAPACITY):
+        self.capacity = capacity
+        self.keys = set()
+        self.order = deque()
+
+    def __len__(self):
+        return len(self.keys)
 
     def add(self, state):
-        h = state.heuristic()
-        hstate = linkedList(state, None)
-        if h in self.hashMap:
-            nxt = self.hashMap[h]
-            while nxt.next is not None:
-                nxt = nxt.next
-            nxt.next = hstate
-        else:
-            self.hashMap[h] = hstate
+        key = state.hash_key()
+        if key in self.keys:
+            return
+        self.keys.add(key)
+        self.order.append(key)
+        if len(self.order) > self.capacity:
+            self.keys.discard(self.order.popleft())
 
     def statePresent(self, state):
-        h = state.heuristic()
-        if h in self.hashMap:
-            nxt = self.hashMap[h]
-            if nxt.value == state:
-                return True
-            while nxt.next is not None:
-                if nxt.value == state:
-                    return True
-                nxt = nxt.next
-        return False
-
-
-class linkedList:
-    def __init__(self, value, nxt):
-        self.value = value
-        self.next = nxt
+        return state.hash_key() in self.keys
@@ -2,6 +2,9 @@ import math
 import random
 import sys
 import copy
+from functools import lru_cache
+
+from Othello.zobrist import zobrist_keys, zobrist_hash
 
 EMPTY = 2
 PLAYER1 = 0
@@ -9,6 +12,32 @@ PLAYER2 = 1
 PLAYER_NAMES = ["O", "X", "."]
 OTHER_PLAYER = {PLAYER1:PLAYER2, PLAYER2:PLAYER1}
 
+# the 8 directions in which a move can capture, as (dx, dy)
+DIRECTIONS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+
+# Contribution of a disc on each square to State.heuristic(), as two lists indexed by x*boardSize + y:
+# weights[PLAYER1][sq] >= 0 and weights[PLAYER2][sq] <= 0. Built from the original rules, which test the
+# fixed rows/columns 0..7 whatever the board size and charge a PLAYER2 corner the edge weight as well
+# (-6 - 4); keep them as they are so that agents' play does not change
+@lru_cache(maxsize=None)
+def positional_weights(boardSize = 8):
+    weights = ([], [])
+    for i in range(boardSize):
+        for j in range(boardSize):
+            corner = (i == 0 and j == 0) or (i == 7 and j == 7) or (i == 0 and j == 7) or (i == 7 and j == 0)
+            if i == 0 or i == 7 or j == 0 or j == 7:
+                ring = 4
+            elif i == 1 or i == 6 or j == 1 or j == 6:
+                ring = 3
+            elif i == 2 or i == 5 or j == 2 or j == 5:
+                ring = 2
+            else:
+                ring = 1
+            weights[PLAYER1].append(6 if corner else ring)
+            weights[PLAYER2].append(-ring - (6 if corner else 0))
+    return weights
+
 class OthelloMove:
     def __init__(self, player , x , y ):
         self.player = player
@@ -21,7 +50,12 @@ class OthelloMove:
 
 class State:
     def __init__(self, board = None, boardSize = 8, nextPlayerToMove = PLAYER1):
-        
+        # Zobrist hash and heuristic value, computed on first use and then kept up to date by applyMove
+        self._key = None
+        self._eval = None
+        # legal moves and their strings per side, computed on first use and dropped when a disc is placed
+        self._moves = None
+
         if board:
             self.board = board
             self.boardSize = boardSize
@@ -54,7 +88,20 @@ class State:
         return self.board == state.board
 
     def clone(self):
-        return State(copy.deepcopy(self.board), self.boardSize, self.nextPlayerToMove)
+        newState = State(copy.deepcopy(self.board), self.boardSize, self.nextPlayerToMove)
+        newState._key = self._key
+        newState._eval = self._eval
+        # the cached lists are never modified in place, so the copy can share them
+        if self._moves is not None:
+            newState._moves = list(self._moves)
+        return newState
+
+    # Zobrist hash of the position including the side to move (see Othello/zobrist.py)
+    def hash_key(self):
+        if self._key is None:
+            p1, p2, side = self.pack()
+            self._key = zobrist_hash(p1, p2, side, self.boardSize * self.boardSize)
+        return self._key
 
     def is_legal(self, x, y):
         return x >= 0 and x < self.boardSize and y >= 0 and y < self.boardSize
@@ -71,10 +118,37 @@ class State:
 
     def equals(self, state):
         return self.board == state.board
+
+    # Compact form of the position: one bitmask per player plus the side to move
+    # square (x, y) maps to bit x*boardSize + y, matching the order generateMoves scans the board
+    def pack(self):
+        masks = [0, 0]
+        bit = 1
+        for i in range(self.boardSize):
+            for j in range(self.boardSize):
+                if self.board[i][j] != EMPTY:
+                    masks[self.board[i][j]] |= bit
+                bit <<= 1
+        return masks[PLAYER1], masks[PLAYER2], self.nextPlayerToMove
+
+    # Rebuilds a State from the output of pack()
+    @staticmethod
+    def from_packed(packed, boardSize = 8):
+        p1, p2, nextPlayerToMove = packed
+        board = [[EMPTY] * boardSize for y in range(boardSize)]
+        bit = 1
+        for i in range(boardSize):
+            for j in range(boardSize):
+                if p1 & bit:
+                    board[i][j] = PLAYER1
+                elif p2 & bit:
+                    board[i][j] = PLAYER2
+                bit <<= 1
+        return State(board, boardSize, nextPlayerToMove)
     
     # Determines whether the game is over or not
     def game_over(self):
-        return len(self.generateMoves(PLAYER1)) == 0 and len(self.generateMoves(PLAYER2)) == 0
+        return len(self.legalMoves(PLAYER1)) == 0 and len(self.legalMoves(PLAYER2)) == 0
 
     # Returns the final score, once a game is over
     def score(self):
@@ -88,40 +162,51 @@ class State:
         return score
 
     # Heuristic function based on piece stability
-    # stability defined by distance from edge of board
+    # stability defined by distance from edge of board; the weight of every square is in positional_weights()
+    # the value is computed on first use and then updated by applyMove for the placed and flipped discs only
     def heuristic(self):
-        score = 0
-        for i in range(self.boardSize):
-            for j in range(self.boardSize):
-                if self.board[i][j] == PLAYER1:
-                    if (i == 0 and j == 0) or (i == 7 and j == 7) or (i == 0 and j == 7) or (i == 7 and j == 0):
-                        score += 6
-                    elif i == 0 or i == 7 or j == 0 or j == 7:
-                        score += 4
-                    elif i == 1 or i == 6 or j == 1 or j == 6:
-                        score += 3
-                    elif i == 2 or i == 5 or j == 2 or j == 5:
-                        score += 2
-                    else:
-                        score += 1
-                if self.board[i][j] == PLAYER2:
-                    if (i == 0 and j == 0) or (i == 7 and j == 7) or (i == 0 and j == 7) or (i == 7 and j == 0):
-                        score -= 6
-                    if i == 0 or i == 7 or j == 0 or j == 7:
-                        score -= 4
-                    elif i == 1 or i == 6 or j == 1 or j == 6:
-                        score -= 3
-                    elif i == 2 or i == 5 or j == 2 or j == 5:
-                        score -= 2
-                    else:
-                        score -= 1
-        return score
+        if self._eval is None:
+            weights = positional_weights(self.boardSize)
+            score = 0
+            sq = 0
+            for row in self.board:
+                for owner in row:
+                    if owner != EMPTY:
+                        score += weights[owner][sq]
+                    sq += 1
+            self._eval = score
+        return self._eval
     
     #  Returns the list of possible moves for player 'player'
+    # the list is the caller's to modify; see legalMoves() for the shared cached one
     def generateMoves(self, player = None):
+        return list(self.legalMoves(player))
+
+    # Legal moves for 'player' (default: the side to move), scanned once per position and side
+    # the returned list is shared with later calls, so it must not be modified
+    def legalMoves(self, player = None):
+        if player == None:
+            player = self.nextPlayerToMove
+        cache = self._moves
+        if cache is None:
+            cache = self._moves = [None, None, None, None]   # moves of PLAYER1, PLAYER2, then their strings
+        moves = cache[player]
+        if moves is None:
+            moves = cache[player] = self.scanMoves(player)
+        return moves
 
+    # str() of every legalMoves(player) entry, as sent to clients
+    def moveStrings(self, player = None):
         if player == None:
             player = self.nextPlayerToMove
+        moves = self.legalMoves(player)
+        strings = self._moves[2 + player]
+        if strings is None:
+            strings = self._moves[2 + player] = [str(m) for m in moves]
+        return strings
+
+    # Scans the board for the legal moves of 'player'
+    def scanMoves(self, player):
         moves = []
 
         # these two arrays encode the 8 posible directions in which a player can capture pieces:
@@ -156,17 +241,40 @@ class State:
 
         if move == None:
             print("\nPlayer " + PLAYER_NAMES[self.nextPlayerToMove] + " passes the move!")
-            self.nextPlayerToMove = OTHER_PLAYER[self.nextPlayerToMove]
-            return #player passes
+        self.make_move(move)
+
+    # In-place version of applyMove for search: returns an undo record (move, flipped squares,
+    # previous side to move, previous hash, previous heuristic) that unmake_move uses to restore the position
+    # move may be None for a pass; nothing is printed
+    def make_move(self, move):
+        undo = (move, [], self.nextPlayerToMove, self._key, self._eval)
+
+        # a pass leaves both sides' legal moves as they were
+        if move is not None:
+            self._moves = None
+
+        keys = None
+        if self._key is not None:
+            keys, sideKey = zobrist_keys(self.boardSize * self.boardSize)
+            self._key ^= sideKey
 
         self.nextPlayerToMove = OTHER_PLAYER[self.nextPlayerToMove]
+        if move == None:
+            return undo #player passes
         
         # set the piece:
         self.board[move.x][move.y] = move.player
+        if keys is not None:
+            self._key ^= keys[move.player][move.x * self.boardSize + move.y]
+        weights = None
+        if self._eval is not None:
+            weights = positional_weights(self.boardSize)
+            self._eval += weights[move.player][move.x * self.boardSize + move.y]
         
         # these two arrays encode the 8 posible directions in which a player can capture pieces:
         offs_x = [ 0, 1, 1, 1, 0,-1,-1,-1]
         offs_y = [-1,-1, 0, 1, 1, 1, 0,-1]
+        flipped = undo[1]
         
         # see if any pieces are captured:
         for i in range(len(offs_x)):
@@ -183,9 +291,84 @@ class State:
                     reversed_y = move.y + offs_y[i]
                     while reversed_x!=current_x or reversed_y!=current_y :
                         self.board[reversed_x][reversed_y] = move.player
+                        flipped.append((reversed_x, reversed_y))
+                        sq = reversed_x * self.boardSize + reversed_y
+                        if keys is not None:
+                            self._key ^= keys[PLAYER1][sq] ^ keys[PLAYER2][sq]
+                        if weights is not None:
+                            self._eval += weights[move.player][sq] - weights[OTHER_PLAYER[move.player]][sq]
                         reversed_x += offs_x[i]
                         reversed_y += offs_y[i]
                     break
+        return undo
+
+    # Takes back the move recorded in 'undo'; moves must be unmade in reverse order
+    def unmake_move(self, undo):
+        move, flipped, previousPlayer, previousKey, previousEval = undo
+        if move is not None:
+            self.board[move.x][move.y] = EMPTY
+            opponent = OTHER_PLAYER[move.player]
+            for x, y in flipped:
+                self.board[x][y] = opponent
+            self._moves = None
+        self.nextPlayerToMove = previousPlayer
+        self._key = previousKey
+        self._eval = previousEval
+
+    # Plays uniformly random legal moves in place until neither side can move and returns the final score()
+    # A side without a legal move passes. Used by MCTS simulations, so it prints nothing and builds no move
+    # lists: the candidate squares of each ply go into one list reused for the whole playout
+    def rollout(self, rng = random):
+        size = self.boardSize
+        board = self.board
+        candidates = [0] * (size * size)
+        player = self.nextPlayerToMove
+        passed = False
+        while True:
+            count = 0
+            for i in range(size):
+                row = board[i]
+                for j in range(size):
+                    if row[j] == EMPTY and self._flips(i, j, player, False):
+                        candidates[count] = i * size + j
+                        count += 1
+            if count == 0:
+                if passed:
+                    break
+                passed = True
+            else:
+                passed = False
+                sq = candidates[rng.randrange(count)]
+                board[sq // size][sq % size] = player
+                self._flips(sq // size, sq % size, player, True)
+            player = OTHER_PLAYER[player]
+        self.nextPlayerToMove = player
+        self._key = None
+        self._eval = None
+        self._moves = None
+        return self.score()
+
+    # Counts the discs 'player' would capture by playing on the empty square (x, y), turning them over
+    # when 'flip' is set
+    def _flips(self, x, y, player, flip):
+        board = self.board
+        size = self.boardSize
+        opponent = OTHER_PLAYER[player]
+        total = 0
+        for dx, dy in DIRECTIONS:
+            cx = x + dx
+            cy = y + dy
+            n = 0
+            while 0 <= cx < size and 0 <= cy < size and board[cx][cy] == opponent:
+                cx += dx
+                cy += dy
+                n += 1
+            if n and 0 <= cx < size and 0 <= cy < size and board[cx][cy] == player:
+                total += n
+                if flip:
+                    for k in range(1, n + 1):
+                        board[x + k * dx][y + k * dy] = player
+        return total
 
     # Creates a new game state that has the result of applying move 'move'
     def applyMoveCloning(self, move):
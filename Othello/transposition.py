@@ -0,0 +1,72 @@
+# Othello/transposition.py
+# Transposition table for the searching agents.
+# Positions reached through different move orders share a Zobrist key (State.hash_key()), so a search
+# result stored once can cut off or order every later visit to the same position.
+
+# bound types of a stored score
+EXACT = 0
+LOWER = 1   # search failed high: the true score is >= stored score
+UPPER = 2   # search failed low:  the true score is <= stored score
+
+# entry layout: (key, depth, flag, score, move, generation); move is (x, y) or None
+KEY, DEPTH, FLAG, SCORE, MOVE, GENERATION = range(6)
+
+DEFAULT_BUCKETS = 1 << 14
+
+
+class TranspositionTable:
+    # buckets is rounded up to a power of two; each bucket has two slots:
+    # a depth-preferred slot that keeps the deepest result of the current search and an
+    # always-replace slot that takes everything else, so recent shallow results are not lost
+    def __init__(self, buckets = DEFAULT_BUCKETS):
+        size = 1
+        while size < buckets:
+            size <<= 1
+        self.buckets = size
+        self.mask = size - 1
+        self.clear()
+
+    def clear(self):
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    # call once per choose_move: entries from older searches lose their claim on the depth-preferred slot
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        self.probes += 1
+        i = key & self.mask
+        entry = self.deep[i]
+        if entry is not None and entry[KEY] == key:
+            self.hits += 1
+            return entry
+        entry = self.recent[i]
+        if entry is not None and entry[KEY] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move = None):
+        i = key & self.mask
+        entry = (key, depth, flag, score, move, self.generation)
+        deep = self.deep[i]
+        if (deep is None or deep[KEY] == key or depth >= deep[DEPTH]
+                or deep[GENERATION] != self.generation):
+            self.deep[i] = entry
+        else:
+            self.recent[i] = entry
+
+    def __len__(self):
+        return sum(1 for e in self.deep if e is not None) + sum(1 for e in self.recent if e is not None)
+
+    # agents are pickled when they are sent to a process-pool worker; ship an empty table of the
+    # same size rather than the whole contents
+    def __getstate__(self):
+        return {"buckets": self.buckets}
+
+    def __setstate__(self, state):
+        self.__init__(state["buckets"])
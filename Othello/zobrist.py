@@ -0,0 +1,37 @@
+# Othello/zobrist.py
+# Zobrist hashing for Othello positions.
+# Every (player, square) pair and the side to move get a fixed random 64-bit key; the hash of a position is
+# the XOR of the keys of its pieces, so applying a move only XORs in the placed and flipped squares.
+# The keys come from a fixed seed so hashes are the same in every process and across runs.
+
+import random
+from functools import lru_cache
+
+ZOBRIST_SEED = 0x51475021
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(squares = 64):
+    rng = random.Random(ZOBRIST_SEED + squares)
+    pieces = ([rng.getrandbits(64) for sq in range(squares)],   # PLAYER1
+              [rng.getrandbits(64) for sq in range(squares)])   # PLAYER2
+    side = rng.getrandbits(64)                                  # XORed in when PLAYER2 is to move
+    return pieces, side
+
+PIECE_KEYS, SIDE_KEY = zobrist_keys(64)
+
+# key change for a flipped disc: the square goes from one player to the other
+FLIP_KEYS = [PIECE_KEYS[0][sq] ^ PIECE_KEYS[1][sq] for sq in range(64)]
+
+
+# Hash of a packed position (PLAYER1 mask, PLAYER2 mask, side to move); square sq is bit sq
+def zobrist_hash(p1, p2, side, squares = 64):
+    pieces, sideKey = zobrist_keys(squares)
+    h = sideKey if side else 0
+    for player, mask in ((0, p1), (1, p2)):
+        keys = pieces[player]
+        while mask:
+            low = mask & -mask
+            h ^= keys[low.bit_length() - 1]
+            mask ^= low
+    return h
@@ -0,0 +1,153 @@
+# aiPool.py
+# Runs AI move searches off the asyncio event loop.
+# A search can take seconds; running it inside a session coroutine would stall every other
+# QUIC connection on the server (ACKs, timers, handshakes) until it returned.
+
+import asyncio
+import multiprocessing
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from Othello.othello import OthelloMove
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+#entry point executed inside a worker process
+#the board travels packed (two bitmasks + side to move) and the move comes back as plain
+#coordinates, so only a handful of ints cross the process boundary besides the agent itself
+#with a config the worker keeps one agent per config for good: it unpickles the agent from 'agent' (the
+#pickled agent as bytes) only the first time it sees the config, so transposition, killer and history tables
+#carry over from move to move. That agent serves every game the worker is handed, which is why
+#ServerSettings.new_agent turns MCTS tree reuse off in process mode
+_worker_agents = {}
+
+def _choose_move_packed(agent, stateClass, packed, boardSize, config=None):
+    if config is not None:
+        kept = _worker_agents.get(config)
+        if kept is None:
+            kept = _worker_agents[config] = pickle.loads(agent)
+        agent = kept
+    state = stateClass.from_packed(packed, boardSize)
+    move = agent.choose_move(state)
+    if move is None:
+        return None
+    return move.x, move.y
+
+
+#server-wide LRU cache of AI replies, shared by every session
+#key is (position hash, side to move, agent config): the same position against the same kind of opponent
+#gets the same move without a search. Values are (x, y). All access goes through one lock, so the
+#event loop and pool threads can use it together
+class PositionCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return f"{len(self._entries)}/{self.maxsize} positions, {self.hits} hits, {self.misses} misses"
+
+    def get(self, key):
+        with self._lock:
+            coords = self._entries.get(key)
+            if coords is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return coords
+
+    def put(self, key, coords):
+        with self._lock:
+            self._entries[key] = coords
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+#server-wide pool shared by every session
+#workers == 0 keeps the old behaviour of searching inline on the event loop
+#cache_size > 0 remembers that many replies in a PositionCache
+class AIWorkerPool:
+    def __init__(self, workers: int = 0, mode: str = "thread", cache_size: int = 0):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown AI executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        self.workers = max(0, workers)
+        self.mode = mode
+        self._executor = None
+        self.cache = PositionCache(cache_size) if cache_size > 0 else None
+        # process mode: pickled agent per config, made once and handed to workers that lack that agent
+        self._templates = {}
+
+        if self.workers > 0:
+            if mode == "process":
+                # spawn, not fork: forked workers would inherit the server's UDP socket and keep the port bound
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qgp-ai")
+
+    def __str__(self):
+        if self._executor is None:
+            description = "inline"
+        else:
+            description = f"{self.mode} pool x{self.workers}"
+        if self.cache is not None:
+            description += f", position cache of {self.cache.maxsize}"
+        return description
+
+    #returns the agent's move for state without blocking the event loop
+    #the session coroutine is suspended here and resumes when the worker finishes
+    #config names the agent's settings; when given, replies are looked up in and added to the position cache
+    async def choose_move(self, agent, state, config=None):
+        if self.cache is None or config is None:
+            return await self._search(agent, state, config)
+
+        key = (state.hash_key(), state.nextPlayerToMove, config)
+        coords = self.cache.get(key)
+        if coords is not None:
+            # a hash collision must not produce an illegal move: only a legal cached reply is used
+            for move in state.legalMoves(state.nextPlayerToMove):
+                if move.x == coords[0] and move.y == coords[1]:
+                    return move
+        move = await self._search(agent, state, config)
+        if move is not None:
+            self.cache.put(key, (move.x, move.y))
+        return move
+
+    #in process mode a config makes the workers keep their own agent for it (see _choose_move_packed);
+    #every session with the same config shares that agent, as their agents are all built alike
+    async def _search(self, agent, state, config=None):
+        if self._executor is None:
+            return agent.choose_move(state)
+
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            # the owning session is suspended on this await, so nothing else touches state meanwhile
+            return await loop.run_in_executor(self._executor, agent.choose_move, state)
+
+        if config is not None:
+            template = self._templates.get(config)
+            if template is None:
+                template = self._templates[config] = pickle.dumps(agent)
+            agent = template
+        coords = await loop.run_in_executor(
+            self._executor, _choose_move_packed, agent, type(state), state.pack(), state.boardSize, config
+        )
+        if coords is None:
+            return None
+        return OthelloMove(state.nextPlayerToMove, coords[0], coords[1])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
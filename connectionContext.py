@@ -2,6 +2,8 @@
 
 from enum import Enum, auto
 
+from pdu import QGPOption, CODEC_JSON, CODEC_BINARY
+
 class QGPState(Enum):
     STATE_PREINITIALIZATION       = auto()  # cli sends hello, svr sends response -> next
     STATE_INITIALIZATION          = auto()  # svr sends login, svr receives login_response, svr sends login_confirm -> next
@@ -14,6 +16,30 @@ class ConnectionContext:
         self.username = None
         self.game = "Othello"
         self.last_message_type = None
+        self.options = QGPOption(0)
+        self.codec = CODEC_JSON
+        # DELTA_STATE bookkeeping: last packed board sent (server) or reconstructed (client) and its sequence number
+        self.board = None
+        self.seq = 0
+        # token the game is saved under in the server's SessionRegistry (sent in LOGIN_CONFIRM)
+        self.resume_token = None
+
+    # record the options both sides agreed on in CLIENT_HELLO / SERVER_RESPONSE
+    def applyOptions(self, options):
+        self.options = QGPOption(options)
+        self.codec = CODEC_BINARY if QGPOption.BINARY_CODEC in self.options else CODEC_JSON
+
+    # boards travel packed, not as printable strings, with the binary codec or delta updates
+    def packedBoards(self):
+        return self.codec == CODEC_BINARY or QGPOption.DELTA_STATE in self.options
+
+    # move forward to 'state' in one step, skipping the states in between
+    # FAST_START goes from PREINITIALIZATION straight to ACTIVE: no message can observe INITIALIZATION
+    def advanceTo(self, state):
+        if state.value <= self.state.value:
+            raise ValueError(f"cannot go from {self.state} back to {state}")
+        self.state = state
+        print(f"state advanced to {self.state}")
 
     def advanceState(self):
         match self.state:
@@ -1,7 +1,8 @@
 # PDU definition and management
 
 import json
-from enum import IntEnum
+import struct
+from enum import IntEnum, IntFlag
 
 #defines valid communication states (PDU)
 
@@ -14,26 +15,247 @@ class MsgType(IntEnum):
     SEND_COMMAND    = 6
     GAME_STATE      = 7
     EXIT            = 8
+    RESYNC          = 9     # client lost track of delta updates and asks for the full board
+    RESUME          = 10    # instead of LOGIN_RESPONSE: continue the game saved under a resume token
+
+#feature bits carried in the CLIENT_HELLO options field
+#the server answers with the subset it accepts in the SERVER_RESPONSE options field
+class QGPOption(IntFlag):
+    BINARY_CODEC    = 1
+    DELTA_STATE     = 2     # GAME_STATE sends only the squares that changed, with a sequence number
+    FAST_START      = 4     # CLIENT_HELLO carries the credentials; no LOGIN_REQUEST / LOGIN_RESPONSE round trip
+
+#wire encodings for QGPMessage
+#JSON is always understood; the binary codec is used only once both sides agreed on BINARY_CODEC
+CODEC_JSON   = "json"
+CODEC_BINARY = "binary"
+
+#binary PDUs start with a version byte that has the high bit set; a JSON PDU always starts with '{'
+BINARY_VERSION = 1
+BINARY_HEADER  = struct.Struct("!BB")      # version marker, message type
+BOARD_STRUCT   = struct.Struct("!QQB")     # PLAYER1 mask, PLAYER2 mask, side to move
+DELTA_HDR      = struct.Struct("!BB")      # side to move, number of changed squares
+FLAGS_STRUCT   = struct.Struct("!B")       # which optional GAME_STATE parts follow
+COUNT_STRUCT   = struct.Struct("!B")
+TEXT_LEN       = struct.Struct("!H")
+MOVE_INDEX     = struct.Struct("!i")
+SEQ_STRUCT     = struct.Struct("!I")
+
+#range of a SEND_COMMAND moveIndex, which the binary codec sends as a signed 32-bit int
+MOVE_INDEX_MIN = -(1 << 31)
+MOVE_INDEX_MAX = (1 << 31) - 1
+
+GS_INTERMEDIATE = 0x01
+GS_ERROR        = 0x02
+GS_FINAL        = 0x04
+GS_DELTA        = 0x08      # board (and intermediate board) slots hold XOR deltas, not full boards
+GS_SEQ          = 0x10
 
 #defines a valid message with methods to convert to and from bytes for sending over wire
 #type is the int representation of the valid MsgTypes defined above
 #fields are the payload
+#with the binary codec a GAME_STATE board is a packed (PLAYER1 mask, PLAYER2 mask, side to move) tuple
+#and its moves are square indices (x * 8 + y) instead of the printable strings used with JSON
+#with DELTA_STATE the packed board may be replaced by "delta" (see board_delta) and every GAME_STATE has a "seq"
 class QGPMessage:
     def __init__(self, mtype: MsgType, **fields):
         self.type = int(mtype)
         self.fields = fields
 
-    def to_bytes(self) -> bytes:
+    def to_bytes(self, codec: str = CODEC_JSON) -> bytes:
+        if codec == CODEC_BINARY:
+            return _encode_binary(self)
         return json.dumps({
             "type": self.type,
             "fields": self.fields
         }).encode("utf-8")
 
+    #the codec is detected from the first byte, so either encoding is accepted at any time
     @staticmethod
     def from_bytes(data: bytes) -> "QGPMessage":
+        if data and data[0] & 0x80:
+            return _decode_binary(data)
         obj = json.loads(data.decode("utf-8"))
         mtype = MsgType(obj["type"])
         return QGPMessage(mtype, **obj["fields"])
 
     def __repr__(self):
         return f"<QGPMessage type={self.type} fields={self.fields}>"
+
+
+#delta between two packed boards: the squares that changed for each player plus the new side to move
+def board_delta(old, new):
+    return old[0] ^ new[0], old[1] ^ new[1], new[2]
+
+def apply_board_delta(old, delta):
+    return old[0] ^ delta[0], old[1] ^ delta[1], delta[2]
+
+
+#binary codec
+#GAME_STATE and SEND_COMMAND, the messages exchanged every turn, have fixed struct layouts;
+#the rare handshake messages carry their fields as compact JSON after the header
+def _pack_text(out: bytearray, text: str):
+    raw = text.encode("utf-8")
+    out += TEXT_LEN.pack(len(raw))
+    out += raw
+
+def _unpack_text(view: memoryview, offset: int):
+    (length,) = TEXT_LEN.unpack_from(view, offset)
+    offset += TEXT_LEN.size
+    return str(view[offset:offset + length], "utf-8"), offset + length
+
+#a full board is BOARD_STRUCT; a delta lists only the changed squares, one byte each:
+#the square index in the low 6 bits and which player masks toggled in the top 2 bits
+#(a placed disc toggles one mask, a flipped disc toggles both)
+def _pack_board(out: bytearray, board, delta: bool):
+    p1, p2, side = board
+    if not delta:
+        out += BOARD_STRUCT.pack(p1, p2, side)
+        return
+    squares = bytearray()
+    changed = p1 | p2
+    while changed:
+        low = changed & -changed
+        squares.append((low.bit_length() - 1) | (0x40 if p1 & low else 0) | (0x80 if p2 & low else 0))
+        changed ^= low
+    out += DELTA_HDR.pack(side, len(squares))
+    out += squares
+
+def _unpack_board(view: memoryview, offset: int, delta: bool):
+    if not delta:
+        return BOARD_STRUCT.unpack_from(view, offset), offset + BOARD_STRUCT.size
+    side, count = DELTA_HDR.unpack_from(view, offset)
+    offset += DELTA_HDR.size
+    p1 = p2 = 0
+    for code in view[offset:offset + count]:
+        bit = 1 << (code & 0x3F)
+        if code & 0x40:
+            p1 |= bit
+        if code & 0x80:
+            p2 |= bit
+    return (p1, p2, side), offset + count
+
+def _encode_binary(msg: QGPMessage) -> bytes:
+    fields = msg.fields
+    out = bytearray(BINARY_HEADER.pack(0x80 | BINARY_VERSION, msg.type))
+
+    if msg.type == MsgType.GAME_STATE:
+        delta = "delta" in fields
+        board = fields["delta"] if delta else fields["board"]
+        intermediate = fields.get("intermediateDelta" if delta else "intermediateBoard")
+        error = fields.get("error")
+        final = fields.get("final")
+        seq = fields.get("seq")
+        flags = ((GS_INTERMEDIATE if intermediate else 0) | (GS_ERROR if error else 0)
+                 | (GS_FINAL if final else 0) | (GS_DELTA if delta else 0)
+                 | (GS_SEQ if seq is not None else 0))
+        out += FLAGS_STRUCT.pack(flags)
+        _pack_board(out, board, delta)
+        if seq is not None:
+            out += SEQ_STRUCT.pack(seq)
+        if intermediate:
+            _pack_board(out, intermediate, delta)
+        moves = fields.get("moves", [])
+        out += COUNT_STRUCT.pack(len(moves))
+        out += bytes(moves)
+        if error:
+            _pack_text(out, error)
+        if final:
+            _pack_text(out, final)
+
+    elif msg.type == MsgType.SEND_COMMAND:
+        out += MOVE_INDEX.pack(fields["moveIndex"])
+
+    else:
+        out += json.dumps(fields, separators=(",", ":")).encode("utf-8")
+
+    return bytes(out)
+
+def _decode_binary(data: bytes) -> QGPMessage:
+    view = memoryview(data)
+    version, mtype = BINARY_HEADER.unpack_from(view, 0)
+    if version & 0x7F != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary PDU version {version & 0x7F}")
+    mtype = MsgType(mtype)
+    offset = BINARY_HEADER.size
+
+    if mtype == MsgType.GAME_STATE:
+        (flags,) = FLAGS_STRUCT.unpack_from(view, offset)
+        offset += FLAGS_STRUCT.size
+        delta = bool(flags & GS_DELTA)
+        board, offset = _unpack_board(view, offset, delta)
+        fields = {"delta" if delta else "board": board}
+        if flags & GS_SEQ:
+            (fields["seq"],) = SEQ_STRUCT.unpack_from(view, offset)
+            offset += SEQ_STRUCT.size
+        if flags & GS_INTERMEDIATE:
+            fields["intermediateDelta" if delta else "intermediateBoard"], offset = _unpack_board(view, offset, delta)
+        (count,) = COUNT_STRUCT.unpack_from(view, offset)
+        offset += COUNT_STRUCT.size
+        fields["moves"] = list(view[offset:offset + count])
+        offset += count
+        if flags & GS_ERROR:
+            fields["error"], offset = _unpack_text(view, offset)
+        if flags & GS_FINAL:
+            fields["final"], offset = _unpack_text(view, offset)
+        return QGPMessage(mtype, **fields)
+
+    if mtype == MsgType.SEND_COMMAND:
+        (moveIndex,) = MOVE_INDEX.unpack_from(view, offset)
+        return QGPMessage(mtype, moveIndex=moveIndex)
+
+    fields = json.loads(str(view[offset:], "utf-8")) if len(view) > offset else {}
+    return QGPMessage(mtype, **fields)
+
+
+#QUIC delivers a stream as a byte sequence, not as messages: one StreamDataReceived event can hold
+#several PDUs or only part of one. Every PDU is therefore sent as a frame: a 4-byte big-endian
+#length followed by the encoded message.
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 1 << 20
+
+def frame(payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+#incremental reassembly of frames for one stream
+#received chunks are appended to a single buffer and complete frames are cut from a read offset,
+#so a partial frame left at the tail is not copied again for every chunk that arrives
+class FrameDecoder:
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        self._offset = 0
+
+    #returns the payloads of every frame completed by data, in order
+    def feed(self, data: bytes) -> list:
+        buf = self._buffer
+        buf += data
+        end = len(buf)
+        offset = self._offset
+        header = FRAME_HEADER.size
+        payloads = []
+
+        with memoryview(buf) as view:
+            while end - offset >= header:
+                (length,) = FRAME_HEADER.unpack_from(view, offset)
+                if length > self.max_frame_size:
+                    raise ValueError(f"frame of {length} bytes exceeds limit of {self.max_frame_size}")
+                if end - offset - header < length:
+                    break
+                start = offset + header
+                payloads.append(bytes(view[start:start + length]))
+                offset = start + length
+
+        # compact only once the consumed prefix is at least half the buffer
+        if offset == end:
+            buf.clear()
+            offset = 0
+        elif offset and offset * 2 >= end:
+            del buf[:offset]
+            offset = 0
+        self._offset = offset
+        return payloads
+
+    #number of buffered bytes that do not yet form a complete frame
+    def pending(self) -> int:
+        return len(self._buffer) - self._offset
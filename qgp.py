@@ -10,32 +10,68 @@ import asyncio
 import subprocess
 import sys
 import os
+import random
+import signal
+import shutil
+import tempfile
+import traceback
 from typing import Dict, Optional
 
 from aioquic.asyncio import connect, serve
 from aioquic.asyncio.protocol import QuicConnectionProtocol
+from aioquic.asyncio.server import QuicServer
 from aioquic.quic.configuration import QuicConfiguration
-from aioquic.quic.events import HandshakeCompleted, StreamDataReceived
-from aioquic.tls import SessionTicket
+from aioquic.quic.events import HandshakeCompleted, StreamDataReceived, ConnectionTerminated
 
-from pdu import MsgType, QGPMessage
+from pdu import MsgType, QGPMessage, QGPOption, CODEC_BINARY, FrameDecoder, frame, board_delta, apply_board_delta
+from pdu import MOVE_INDEX_MIN, MOVE_INDEX_MAX
 from connectionContext import ConnectionContext, QGPState
+from aiPool import AIWorkerPool, EXECUTOR_MODES
+from sessionTickets import SessionTicketStore, FileTicketStore, ClientTicketCache, TICKET_STORE_SIZE
+from sessionRegistry import SessionRegistry, SESSION_LIMIT, SESSION_IDLE_SECONDS
 from datetime import datetime
-from Othello.agent   import MinimaxAgent, RandomAgent, HumanPlayer, AlphaBeta
+from Othello.agent   import MinimaxAgent, RandomAgent, HumanPlayer, AlphaBeta, ENDGAME_EMPTIES
 from Othello.othello import State as OthelloState, OthelloMove, PLAYER1, PLAYER2
+from Othello.bitboard import BitboardState
 from Othello.game    import Game as OthelloGame, Player as OthelloPlayer
 from Othello.mcts    import mcts
+from Othello.evaluation import EVALUATORS, make_evaluator
+from Othello.book import OpeningBook
 
 
 ALPN = "servers_are_fun?"
 
+# Othello State implementations the server can run games on; both expose the same API
+ENGINES = {"bitboard": BitboardState, "list": OthelloState}
+
+# depth cap for the time-budgeted AI; in practice the move budget or the empty squares stop it first
+AI_MAX_DEPTH = 64
+
+# search depth of minimax / alpha-beta without a move budget, and MCTS iterations per move
+AI_DEPTH = 3
+AI_MCTS_ITERATIONS = 1000
+
+# --ai-agent choices; "auto" is minimax, or alpha-beta when --ai-move-ms is given
+AI_AGENTS = ("auto", "minimax", "alphabeta", "mcts")
+
+# CLIENT_HELLO options this server is able to honour
+SUPPORTED_OPTIONS = QGPOption.BINARY_CODEC | QGPOption.DELTA_STATE | QGPOption.FAST_START
+
 #define QUIC stream and connection handlers
+#on the receive side an event carries exactly one PDU reassembled from the stream,
+#on the send side the handler frames the data before handing it to QUIC
+#a send event may also carry a list of PDUs, which go out framed back to back in a single stream write
 class QuicStreamEvent:
-    def __init__(self, stream_id: int, data: bytes, end_stream: bool):
+    def __init__(self, stream_id: int, data, end_stream: bool):
         self.stream_id = stream_id
         self.data = data
         self.end_stream = end_stream
 
+    def framed(self) -> bytes:
+        if isinstance(self.data, list):
+            return b"".join(frame(payload) for payload in self.data)
+        return frame(self.data) if self.data else b""
+
 
 class EchoQuicConnection:
     def __init__(self, send_func, recv_coro, close_func, new_stream_func):
@@ -62,9 +98,145 @@ def launch_othello_subprocess():
 def timestamp() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+
+#server-wide settings and shared resources handed to every session
+class ServerSettings:
+    def __init__(self, ai_pool: Optional[AIWorkerPool] = None, engine: str = "bitboard",
+                 ai_move_ms: Optional[int] = None, ai_agent: str = "auto", ai_eval: str = "positional",
+                 book: Optional[str] = None, ai_endgame: int = ENDGAME_EMPTIES,
+                 sessions: Optional[SessionRegistry] = None):
+        if ai_agent not in AI_AGENTS:
+            raise ValueError(f"Unknown AI agent {ai_agent!r}, expected one of {AI_AGENTS}")
+        make_evaluator(ai_eval)  # rejects unknown names up front
+        self.ai_pool = ai_pool if ai_pool is not None else AIWorkerPool()
+        self.engine = engine
+        self.state_class = ENGINES[engine]
+        self.ai_move_ms = ai_move_ms
+        if ai_agent == "auto":
+            ai_agent = "alphabeta" if ai_move_ms else "minimax"
+        self.ai_agent = ai_agent
+        self.ai_eval = ai_eval
+        # one memory-mapped opening book shared by every session's agent
+        self.book = OpeningBook(book) if book else None
+        self.ai_endgame = ai_endgame
+        # names the agent settings in the AI pool's position cache; every session's agent is built alike
+        self.agent_config = self.describe_agent()
+        # games that can be resumed on a new connection
+        self.sessions = sessions if sessions is not None else SessionRegistry()
+
+    #opponent for a new session: a fixed-depth minimax or alpha-beta, an iterative-deepening
+    #alpha-beta that answers within ai_move_ms when a move budget is configured, or MCTS
+    #every session gets its own agent and evaluator, so searches share no state, except in a process pool whose
+    #workers search with one agent of their own per config (see aiPool._choose_move_packed)
+    def new_agent(self):
+        if self.ai_agent == "mcts":
+            # process-pool workers share one agent between all games, so a kept tree would mostly be another game's
+            pooled = self.ai_pool.mode == "process" and self.ai_pool.workers > 0
+            return mcts(AI_MCTS_ITERATIONS, moveTimeMs=self.ai_move_ms, reuseTree=not pooled)
+        evaluator = make_evaluator(self.ai_eval)
+        if self.ai_agent == "alphabeta":
+            if self.ai_move_ms:
+                return AlphaBeta(AI_MAX_DEPTH, moveTimeMs=self.ai_move_ms, evaluator=evaluator, book=self.book,
+                                 endgameEmpties=self.ai_endgame)
+            return AlphaBeta(AI_DEPTH, evaluator=evaluator, book=self.book, endgameEmpties=self.ai_endgame)
+        return MinimaxAgent(AI_DEPTH, evaluator=evaluator, book=self.book)
+
+    def describe_agent(self) -> str:
+        if self.ai_agent == "mcts":
+            if self.ai_move_ms:
+                return f"mcts, {self.ai_move_ms} ms per move"
+            return f"mcts, {AI_MCTS_ITERATIONS} iterations"
+        if self.ai_agent == "alphabeta" and self.ai_move_ms:
+            description = f"alphabeta, {self.ai_move_ms} ms per move, {self.ai_eval} evaluation"
+        else:
+            description = f"{self.ai_agent}, depth {AI_DEPTH}, {self.ai_eval} evaluation"
+        if self.ai_agent == "alphabeta" and self.ai_endgame:
+            description += f", exact endgame from {self.ai_endgame} empties"
+        if self.book is not None:
+            description += f", opening book {self.book}"
+        return description
+
+    def close(self):
+        print(f"[server] Resumable games: {self.sessions}")
+        if self.ai_pool.cache is not None:
+            print(f"[server] AI position cache: {self.ai_pool.cache}")
+        self.ai_pool.shutdown()
+        if self.book is not None:
+            self.book.close()
+
+
+#builds a GAME_STATE for the current board in the session's negotiated codec, listing the legal moves of
+#'player' (None for no moves); they come from the state's legal-move cache, so nothing is rescanned
+#JSON carries the printable board and move descriptions, the binary codec the packed board and square indices
+#with DELTA_STATE the board is sent as the change since the previous GAME_STATE, numbered by ctx.seq;
+#clearing ctx.board forces the next message to carry the full board again
+def game_state_message(ctx: ConnectionContext, player, intermediate=None, **fields) -> QGPMessage:
+    state = ctx.othello_state
+    if player is None:
+        fields["moves"] = []
+    elif ctx.codec == CODEC_BINARY:
+        fields["moves"] = [m.x * state.boardSize + m.y for m in state.legalMoves(player)]
+    else:
+        fields["moves"] = state.moveStrings(player)
+
+    if QGPOption.DELTA_STATE in ctx.options:
+        packed = state.pack()
+        previous = ctx.board
+        ctx.seq += 1
+        fields["seq"] = ctx.seq
+        if previous is None:
+            fields["board"] = packed
+            if intermediate is not None:
+                fields["intermediateBoard"] = intermediate.pack()
+        else:
+            fields["delta"] = board_delta(previous, packed)
+            if intermediate is not None:
+                fields["intermediateDelta"] = board_delta(previous, intermediate.pack())
+        ctx.board = packed
+    elif ctx.codec == CODEC_BINARY:
+        fields["board"] = state.pack()
+        if intermediate is not None:
+            fields["intermediateBoard"] = intermediate.pack()
+    else:
+        fields["board"] = str(state)
+        if intermediate is not None:
+            fields["intermediateBoard"] = str(intermediate)
+    return QGPMessage(MsgType.GAME_STATE, **fields)
+
+#inverse of game_state_message on the client: printable board, intermediate board and move list
+#returns None when a delta cannot be applied because an earlier GAME_STATE is missing
+def render_game_state(ctx: ConnectionContext, fields):
+    board = fields.get("board", "")
+    intermediate = fields.get("intermediateBoard", None)
+    moves = fields.get("moves", [])
+
+    if QGPOption.DELTA_STATE in ctx.options:
+        seq = fields.get("seq")
+        if "delta" in fields:
+            if ctx.board is None or seq != ctx.seq + 1:
+                return None
+            board = apply_board_delta(ctx.board, fields["delta"])
+            if "intermediateDelta" in fields:
+                intermediate = apply_board_delta(ctx.board, fields["intermediateDelta"])
+        ctx.board = tuple(board)
+        ctx.seq = seq
+
+    if ctx.packedBoards():
+        state = BitboardState.from_packed(board)
+        board = str(state)
+        if intermediate:
+            intermediate = str(BitboardState.from_packed(intermediate))
+        if ctx.codec == CODEC_BINARY:
+            moves = [str(OthelloMove(state.nextPlayerToMove, sq // state.boardSize, sq % state.boardSize))
+                     for sq in moves]
+    return board, intermediate, moves
+
+
 #main server-side protocol script
-async def serverProtocol(conn: EchoQuicConnection, stream_id: int):
+async def serverProtocol(conn: EchoQuicConnection, stream_id: int, settings: ServerSettings, protocol=None):
     ctx = ConnectionContext()
+    # user already logged in on this QUIC connection by an earlier stream (AsyncQGPProtocol.user)
+    connection_user = protocol.user if protocol is not None else None
 
     while True:
         try:
@@ -90,12 +262,42 @@ async def serverProtocol(conn: EchoQuicConnection, stream_id: int):
                     )
                     return
 
+                # Accept the requested options we support; later PDUs use the negotiated codec
+                # FAST_START needs the credentials in the hello or a connection that already logged in on another
+                # stream, without them the login is asked for as usual
+                accepted = int(clientMsg.fields.get("options", 0)) & SUPPORTED_OPTIONS
+                if "username" not in clientMsg.fields and connection_user is None:
+                    accepted &= ~QGPOption.FAST_START
+                ctx.applyOptions(accepted)
+
+                if QGPOption.FAST_START in ctx.options:
+                    # Log in from the hello and go straight to ACTIVE: SERVER_RESPONSE, LOGIN_CONFIRM and the first
+                    # GAME_STATE leave in one write, so play starts one round trip after the hello
+                    ctx.username = clientMsg.fields.get("username") or connection_user or "<unknown>"
+                    if protocol is not None:
+                        protocol.user = ctx.username
+                    ctx.advanceTo(QGPState.STATE_ACTIVE)
+                    print(f"{timestamp()} [server] State change: {old_state.name} → {ctx.state.name}")
+                    ctx.othello_state = settings.state_class()
+                    ctx.player2 = settings.new_agent()
+                    ctx.resume_token = settings.sessions.issue(ctx.username, ctx.othello_state)
+                    srv_resp = QGPMessage(MsgType.SERVER_RESPONSE, message="Welcome!", options=int(ctx.options))
+                    login_conf = QGPMessage(MsgType.LOGIN_CONFIRM, status=0, message=f"User {ctx.username} logged in",
+                                            resumeToken=ctx.resume_token)
+                    game_state_msg = game_state_message(ctx, PLAYER1)
+                    moves = ctx.othello_state.legalMoves(PLAYER1)
+                    print(f"{timestamp()} [server] Sending SERVER_RESPONSE + LOGIN_CONFIRM + GAME_STATE: "
+                          f"{srv_resp} {login_conf} [initial board + {len(moves)} moves]")
+                    await conn.send(QuicStreamEvent(stream_id, [srv_resp.to_bytes(), login_conf.to_bytes(ctx.codec),
+                                                                game_state_msg.to_bytes(ctx.codec)], False))
+                    continue
+
                 # Move to INITIALIZATION
                 ctx.advanceState()
                 print(f"{timestamp()} [server] State change: {old_state.name} → {ctx.state.name}")
 
-                # 1a) Send SERVER_RESPONSE (no FIN)
-                srv_resp = QGPMessage(MsgType.SERVER_RESPONSE, message="Welcome!")
+                # 1a) Send SERVER_RESPONSE (no FIN), always JSON so any client can read the accepted options
+                srv_resp = QGPMessage(MsgType.SERVER_RESPONSE, message="Welcome!", options=int(ctx.options))
                 print(f"{timestamp()} [server] Sending SERVER_RESPONSE: {srv_resp}")
                 await conn.send(
                     QuicStreamEvent(stream_id, srv_resp.to_bytes(), False)
@@ -108,46 +310,63 @@ async def serverProtocol(conn: EchoQuicConnection, stream_id: int):
                 )
                 print(f"{timestamp()} [server] Sending LOGIN_REQUEST: {login_req}")
                 await conn.send(
-                    QuicStreamEvent(stream_id, login_req.to_bytes(), False)
+                    QuicStreamEvent(stream_id, login_req.to_bytes(ctx.codec), False)
                 )
                 continue
 
             # STATE_INITIALIZATION
             elif current_state == QGPState.STATE_INITIALIZATION:
-                if clientMsg.type != MsgType.LOGIN_RESPONSE:
+                if clientMsg.type == MsgType.RESUME:
+                    # Continue a saved game: same user and board, a fresh AI agent and token
+                    saved = settings.sessions.take(clientMsg.fields.get("token", ""))
+                    if saved is None:
+                        login_req = QGPMessage(
+                            MsgType.LOGIN_REQUEST,
+                            prompt="Unknown or expired game, please enter username and password"
+                        )
+                        print(f"{timestamp()} [server] RESUME with an unknown token, sending LOGIN_REQUEST")
+                        await conn.send(QuicStreamEvent(stream_id, login_req.to_bytes(ctx.codec), False))
+                        continue
+                    ctx.username = saved.username
+                    ctx.othello_state = settings.state_class.from_packed(saved.packed)
+                    ctx.player2 = settings.new_agent()
+                    login_message = f"Game of {ctx.username} resumed"
+                elif clientMsg.type == MsgType.LOGIN_RESPONSE:
+                    ctx.username = clientMsg.fields.get("username", "<unknown>")
+                    ctx.othello_state = settings.state_class()
+                    ctx.player2 = settings.new_agent()
+                    login_message = f"User {ctx.username} logged in"
+                else:
                     await send_protocol_error(
                         conn, stream_id,
-                        f"Expected LOGIN_RESPONSE in {current_state}, got {clientMsg.type}"
+                        f"Expected LOGIN_RESPONSE or RESUME in {current_state}, got {clientMsg.type}"
                     )
                     return
 
-                # Extract username, transition to ACTIVE
-                ctx.username = clientMsg.fields.get("username", "<unknown>")
+                # transition to ACTIVE; later streams of this connection skip the login
                 ctx.advanceState()
                 print(f"{timestamp()} [server] State change: {old_state.name} → {ctx.state.name}")
+                if protocol is not None:
+                    protocol.user = ctx.username
+                ctx.resume_token = settings.sessions.issue(ctx.username, ctx.othello_state)
 
                 # 2a) Send LOGIN_CONFIRM
                 login_conf = QGPMessage(
                     MsgType.LOGIN_CONFIRM,
                     status=0,
-                    message=f"User {ctx.username} logged in"
+                    message=login_message,
+                    resumeToken=ctx.resume_token
                 )
                 print(f"{timestamp()} [server] Sending LOGIN_CONFIRM: {login_conf}")
                 await conn.send(
-                    QuicStreamEvent(stream_id, login_conf.to_bytes(), False)
+                    QuicStreamEvent(stream_id, login_conf.to_bytes(ctx.codec), False)
                 )
 
-                ctx.othello_state = OthelloState()
-                ctx.player2 = MinimaxAgent(3)
-                # Build list of legal moves for player1
-                moves = ctx.othello_state.generateMoves(PLAYER1)
-                moves_list = [str(m) for m in moves]
-
-                # Send initial GAME_STATE with the board and valid moves
-                board_str = str(ctx.othello_state)
-                game_state_msg = QGPMessage(MsgType.GAME_STATE,board=board_str,moves=moves_list)
-                print(f"{timestamp()} [server] Sending GAME_STATE: [initial board + {len(moves_list)} moves]")
-                await conn.send(QuicStreamEvent(stream_id, game_state_msg.to_bytes(), False))
+                # Send GAME_STATE with the board and player1's valid moves
+                game_state_msg = game_state_message(ctx, PLAYER1)
+                moves = ctx.othello_state.legalMoves(PLAYER1)
+                print(f"{timestamp()} [server] Sending GAME_STATE: [current board + {len(moves)} moves]")
+                await conn.send(QuicStreamEvent(stream_id, game_state_msg.to_bytes(ctx.codec), False))
                 continue
 
             #  STATE_ACTIVE 
@@ -163,89 +382,83 @@ async def serverProtocol(conn: EchoQuicConnection, stream_id: int):
                     move_idx = clientMsg.fields["moveIndex"]
                     # If client typed -1 → exit
                     if move_idx == -1:
+                        settings.sessions.discard(ctx.resume_token)
                         ctx.advanceState()  # STATE_CLOSED
                         print(f"{timestamp()} [server] State change: {old_state.name} → {ctx.state.name}")
 
                         goodbye = QGPMessage(MsgType.EXIT, message="Server says: Goodbye!")
                         print(f"{timestamp()} [server] Sending EXIT: {goodbye}")
-                        await conn.send(QuicStreamEvent(stream_id, goodbye.to_bytes(), True))
+                        await conn.send(QuicStreamEvent(stream_id, goodbye.to_bytes(ctx.codec), True))
                         conn.close()
                         return
 
                     # Otherwise, get the human’s legal moves
-                    legal_moves = ctx.othello_state.generateMoves(ctx.othello_state.nextPlayerToMove)
+                    legal_moves = ctx.othello_state.legalMoves(ctx.othello_state.nextPlayerToMove)
                     if (not isinstance(move_idx, int)) or move_idx < 0 or move_idx >= len(legal_moves):
                         # Invalid index → resend current board + moves + error
-                        board_str = str(ctx.othello_state)
-                        moves_list = [str(m) for m in legal_moves]
-                        error_reply = QGPMessage(
-                            MsgType.GAME_STATE,
-                            board=board_str,
-                            moves=moves_list,
+                        error_reply = game_state_message(
+                            ctx, ctx.othello_state.nextPlayerToMove,
                             error="Invalid move, please choose again."
                         )
                         print(f"{timestamp()} [server] Received invalid move index={move_idx}, resending board+moves with error")
-                        await conn.send(QuicStreamEvent(stream_id, error_reply.to_bytes(), False))
+                        await conn.send(QuicStreamEvent(stream_id, error_reply.to_bytes(ctx.codec), False))
                         continue  # stay in STATE_ACTIVE
 
                     # 2) Valid human move → apply it and record intermediateBoard
                     chosen_move: OthelloMove = legal_moves[move_idx]
                     ctx.othello_state.applyMove(chosen_move)
-                    intermediateBoard = str(ctx.othello_state)
+                    intermediateBoard = ctx.othello_state.clone()
                     print(f"{timestamp()} [server] Applied human move {chosen_move}")
 
                     # 3) If game is now over (immediately after human move):
                     if ctx.othello_state.game_over():
-                        board_str = str(ctx.othello_state)
-                        final_msg = QGPMessage(
-                            MsgType.GAME_STATE,
-                            board=board_str,
-                            moves=[],
+                        final_msg = game_state_message(
+                            ctx, None,
                             final="Game Over: winner = " + ctx.othello_state.winner()
                         )
                         print(f"{timestamp()} [server] Game over immediately after human move {chosen_move}")
-                        await conn.send(QuicStreamEvent(stream_id, final_msg.to_bytes(), False))
+                        settings.sessions.discard(ctx.resume_token)
+                        await conn.send(QuicStreamEvent(stream_id, final_msg.to_bytes(ctx.codec), False))
                         continue  # remain in STATE_ACTIVE (client should send EXIT)
 
                     # 4) Let AI move (PLAYER2), build up error_text describing AI and any forced passes:
                     error_text = ""
-                    next_player = ctx.othello_state.nextPlayerToMove  # should be PLAYER2
-                    ai_moves = ctx.othello_state.generateMoves(next_player)
-                    AImove = ctx.player2.choose_move(ctx.othello_state)
+                    AImove = await settings.ai_pool.choose_move(ctx.player2, ctx.othello_state,
+                                                                settings.agent_config)
                     ctx.othello_state.applyMove(AImove)
                     error_text += f"Opponent applied move {AImove}\n"
                     print(f"{timestamp()} [server] Opponent applied move {AImove}")
 
+                    game_over = False
                     while True:
                         current_side = ctx.othello_state.nextPlayerToMove
-                        human_moves = ctx.othello_state.generateMoves(PLAYER1)
-                        ai_moves    = ctx.othello_state.generateMoves(PLAYER2)
+                        human_moves = ctx.othello_state.legalMoves(PLAYER1)
+                        ai_moves    = ctx.othello_state.legalMoves(PLAYER2)
 
                         # (i) Neither side can move → game over
                         if len(human_moves) == 0 and len(ai_moves) == 0:
-                            board_str = str(ctx.othello_state)
-                            final_msg = QGPMessage(
-                                MsgType.GAME_STATE,
-                                board=board_str,
-                                moves=[],
+                            final_msg = game_state_message(
+                                ctx, None,
                                 final="Game Over: winner = " + ctx.othello_state.winner()
                             )
                             print(f"{timestamp()} [server] Game over after skipping turns")
-                            await conn.send(QuicStreamEvent(stream_id, final_msg.to_bytes(), False))
-                            return
+                            settings.sessions.discard(ctx.resume_token)
+                            await conn.send(QuicStreamEvent(stream_id, final_msg.to_bytes(ctx.codec), False))
+                            game_over = True
+                            break
 
                         # Human’s turn but no moves → pass them, continue letting AI move again
                         if current_side == PLAYER1 and len(human_moves) == 0:
                             ctx.othello_state.applyMove(None)  
                             error_text += "Human had no moves → passed\n"
                             print(f"{timestamp()} [server] Human had no legal moves, passed")
-                            current_side = ctx.othello_state.nextPlayerToMove
-                            ai_moves     = ctx.othello_state.generateMoves(current_side)
+                            # a pass keeps the cached move lists, so ai_moves is still current
                             if len(ai_moves) == 0:
                                 #its a gameover state... go confirm it
                                 continue
 
-                            AImove = ctx.player2.choose_move(ctx.othello_state)
+                            AImove = await settings.ai_pool.choose_move(ctx.player2, ctx.othello_state,
+                                                                        settings.agent_config)
                             ctx.othello_state.applyMove(AImove)
                             error_text += f"Opponent applied move {AImove}\n"
                             print(f"{timestamp()} [server] Opponent applied move {AImove}")
@@ -255,37 +468,57 @@ async def serverProtocol(conn: EchoQuicConnection, stream_id: int):
                             break
 
                         if current_side == PLAYER2 and len(ai_moves) > 0:
-                            AImove = ctx.player2.choose_move(ctx.othello_state)
+                            AImove = await settings.ai_pool.choose_move(ctx.player2, ctx.othello_state,
+                                                                        settings.agent_config)
                             ctx.othello_state.applyMove(AImove)
                             error_text += f"Opponent applied move {AImove}\n"
                             print(f"{timestamp()} [server] Opponent applied move {AImove}")
                             continue
 
-                    board_str = str(ctx.othello_state)
-                    human_moves = ctx.othello_state.generateMoves(PLAYER1)
-                    human_moves_list = [str(m) for m in human_moves]
+                    if game_over:
+                        # like a game over right after the human's move: wait for the client's EXIT, which
+                        # closes this stream (and the connection with its last stream)
+                        continue
+
+                    # otherwise the loop broke on the human's turn, with human_moves computed for this position
 
                     # Trim trailing newline in error_text
                     if error_text.endswith("\n"):
                         error_text = error_text[:-1]
 
-                    reply = QGPMessage(
-                        MsgType.GAME_STATE,
-                        board=board_str,
-                        intermediateBoard=intermediateBoard,
-                        error=error_text if error_text else None,
-                        moves=human_moves_list
+                    reply = game_state_message(
+                        ctx, PLAYER1,
+                        intermediate=intermediateBoard,
+                        error=error_text if error_text else None
                     )
-                    print(f"{timestamp()} [server] Sending updated board + {len(human_moves_list)} moves to client")
-                    await conn.send(QuicStreamEvent(stream_id, reply.to_bytes(), False))
+                    print(f"{timestamp()} [server] Sending updated board + {len(human_moves)} moves to client")
+                    await conn.send(QuicStreamEvent(stream_id, reply.to_bytes(ctx.codec), False))
+                    settings.sessions.save(ctx.resume_token, ctx.othello_state)
+                    continue
+
+                elif clientMsg.type == MsgType.RESYNC:
+                    # Client missed a delta: send the full board and the human's moves again, or the result
+                    # when the update it missed was the last one
+                    ctx.board = None
+                    if ctx.othello_state.game_over():
+                        full_msg = game_state_message(
+                            ctx, None,
+                            final="Game Over: winner = " + ctx.othello_state.winner()
+                        )
+                    else:
+                        player = PLAYER1 if ctx.othello_state.nextPlayerToMove == PLAYER1 else None
+                        full_msg = game_state_message(ctx, player)
+                    print(f"{timestamp()} [server] Client requested RESYNC, sending full board (seq {ctx.seq})")
+                    await conn.send(QuicStreamEvent(stream_id, full_msg.to_bytes(ctx.codec), False))
                     continue
 
                 elif clientMsg.type == MsgType.EXIT:
+                    settings.sessions.discard(ctx.resume_token)
                     ctx.advanceState()  # → STATE_CLOSED
                     print(f"{timestamp()} [server] State change: {old_state.name} → {ctx.state.name}")
                     goodbye = QGPMessage(MsgType.EXIT, message="Server says: Goodbye!")
                     print(f"{timestamp()} [server] Sending EXIT: {goodbye}")
-                    await conn.send(QuicStreamEvent(stream_id, goodbye.to_bytes(), True))
+                    await conn.send(QuicStreamEvent(stream_id, goodbye.to_bytes(ctx.codec), True))
                     conn.close()
                     return
 
@@ -316,18 +549,36 @@ async def serverProtocol(conn: EchoQuicConnection, stream_id: int):
 #main client-side protocol script
 #mirror of server-side logic but wait in each state until we move to next
 #send hello immediately
+#scope carries client settings: "options" holds the QGPOption bits to request, "session_file" the file
+#keeping the resume token of the current game and "resume" whether to continue the game saved there,
+#"username" / "password" credentials to use instead of asking, "bot" to pick random moves without asking.
+#A game on a connection that already logged in ("authenticated") asks for FAST_START without credentials;
+#"logged_in" is an asyncio.Event set once this game's login is confirmed
+#with FAST_START the credentials are asked for up front and travel in the hello
+#returns the final result message when the game was played to the end
 async def clientProtocol(scope: Dict, conn: EchoQuicConnection):
     ctx = ConnectionContext()
+    session_file = scope.get("session_file")
+    resume_token = load_resume_token(session_file) if scope.get("resume") and session_file else None
+    bot = scope.get("bot", False)
 
     # STATE_PREINITIALIZATION: Send CLIENT_HELLO 
     if ctx.state != QGPState.STATE_PREINITIALIZATION:
         return
 
+    options = QGPOption(int(scope.get("options", 0)))
+    credentials = {}
+    if scope.get("authenticated"):
+        options |= QGPOption.FAST_START
+    # a client resuming a game sends no credentials, so the server answers with LOGIN_REQUEST and RESUME follows
+    elif QGPOption.FAST_START in options and resume_token is None:
+        credentials["username"], credentials["password"] = client_credentials(scope)
     hello = QGPMessage(
         MsgType.CLIENT_HELLO,
         version=1,
         gameName="Othello",
-        options=0
+        options=int(options),
+        **credentials
     )
     sid = conn.new_stream()
     print(f"{timestamp()} [client] Sending CLIENT_HELLO: {hello}")
@@ -344,30 +595,57 @@ async def clientProtocol(scope: Dict, conn: EchoQuicConnection):
         await send_protocol_error(conn, sid, "Expected SERVER_RESPONSE")
         return
     print(f"{timestamp()} [client] Received SERVER_RESPONSE: {serverMsg}")
+    # Only options the server accepted are in effect from here on
+    ctx.applyOptions(int(serverMsg.fields.get("options", 0)))
 
-    #  STATE_INITIALIZATION: Expect LOGIN_REQUEST 
-    ev = await conn.receive()
-    serverMsg = QGPMessage.from_bytes(ev.data)
-    if serverMsg.type != MsgType.LOGIN_REQUEST:
-        await send_protocol_error(conn, sid, "Expected LOGIN_REQUEST")
-        return
-    prompt = serverMsg.fields.get("prompt", "")
-    print(f"{timestamp()} [client] Received LOGIN_REQUEST, prompt: '{prompt}'")
-
-    # 3) Send LOGIN_RESPONSE
-    username = input("  Username: ").strip()
-    password = input("  Password: ").strip()
-    login_resp = QGPMessage(MsgType.LOGIN_RESPONSE,username=username,password=password)
-    print(f"{timestamp()} [client] Sending LOGIN_RESPONSE: {login_resp}")
-    await conn.send(QuicStreamEvent(sid, login_resp.to_bytes(), False))
+    # Without FAST_START the server asks for the login
+    serverMsg = None
+    if QGPOption.FAST_START not in ctx.options:
+        #  STATE_INITIALIZATION: Expect LOGIN_REQUEST 
+        ev = await conn.receive()
+        serverMsg = QGPMessage.from_bytes(ev.data)
+        if serverMsg.type != MsgType.LOGIN_REQUEST:
+            await send_protocol_error(conn, sid, "Expected LOGIN_REQUEST")
+            return
+        prompt = serverMsg.fields.get("prompt", "")
+        print(f"{timestamp()} [client] Received LOGIN_REQUEST, prompt: '{prompt}'")
+        serverMsg = None
+
+        # 3a) Continue the saved game; a server that no longer has it asks for the login again
+        if resume_token is not None:
+            resume = QGPMessage(MsgType.RESUME, token=resume_token)
+            print(f"{timestamp()} [client] Sending RESUME: {resume}")
+            await conn.send(QuicStreamEvent(sid, resume.to_bytes(ctx.codec), False))
+            ev = await conn.receive()
+            serverMsg = QGPMessage.from_bytes(ev.data)
+            if serverMsg.type == MsgType.LOGIN_REQUEST:
+                prompt = serverMsg.fields.get("prompt", "")
+                print(f"{timestamp()} [client] Game could not be resumed, prompt: '{prompt}'")
+                serverMsg = None
+
+        # 3b) Send LOGIN_RESPONSE, with the credentials already given for a FAST_START the server declined
+        if serverMsg is None:
+            if credentials:
+                username, password = credentials["username"], credentials["password"]
+            else:
+                username, password = client_credentials(scope)
+            login_resp = QGPMessage(MsgType.LOGIN_RESPONSE,username=username,password=password)
+            print(f"{timestamp()} [client] Sending LOGIN_RESPONSE: {login_resp}")
+            await conn.send(QuicStreamEvent(sid, login_resp.to_bytes(ctx.codec), False))
 
     # INITIALIZATION → now expect LOGIN_CONFIRM
-    ev = await conn.receive()
-    serverMsg = QGPMessage.from_bytes(ev.data)
+    if serverMsg is None:
+        ev = await conn.receive()
+        serverMsg = QGPMessage.from_bytes(ev.data)
     if serverMsg.type != MsgType.LOGIN_CONFIRM:
         await send_protocol_error(conn, sid, "Expected LOGIN_CONFIRM")
         return
     print(f"{timestamp()} [client] Received LOGIN_CONFIRM: {serverMsg}")
+    ctx.resume_token = serverMsg.fields.get("resumeToken")
+    if session_file and ctx.resume_token:
+        save_resume_token(session_file, ctx.resume_token)
+    if "logged_in" in scope:
+        scope["logged_in"].set()
 
     # Transition to ACTIVE
     old_state = ctx.state
@@ -375,15 +653,23 @@ async def clientProtocol(scope: Dict, conn: EchoQuicConnection):
     print(f"{timestamp()} [client] State change: {old_state.name} → {ctx.state.name}")
 
     # STATE_ACTIVE: First, receive the initial GAME_STATE from server
+    resync_requested = False
     while True:
         ev = await conn.receive()
         serverMsg = QGPMessage.from_bytes(ev.data)
 
         # Must be GAME_STATE or EXIT
         if serverMsg.type == MsgType.GAME_STATE:
-            board_str = serverMsg.fields.get("board", "")
-            intermediateBoard = serverMsg.fields.get("intermediateBoard", None)
-            moves_list = serverMsg.fields.get("moves", [])
+            rendered = render_game_state(ctx, serverMsg.fields)
+            if rendered is None:
+                # Sequence gap in delta updates: ask once for the full board and drop deltas until it arrives
+                if not resync_requested:
+                    print(f"{timestamp()} [client] Missed a board update, requesting RESYNC")
+                    await conn.send(QuicStreamEvent(sid, QGPMessage(MsgType.RESYNC).to_bytes(ctx.codec), False))
+                    resync_requested = True
+                continue
+            resync_requested = False
+            board_str, intermediateBoard, moves_list = rendered
             error_msg  = serverMsg.fields.get("error", None)
             final_msg  = serverMsg.fields.get("final", None)
             
@@ -399,14 +685,16 @@ async def clientProtocol(scope: Dict, conn: EchoQuicConnection):
             if final_msg:
                 print(f"{timestamp()} [client] {final_msg}")
                 # Now game is over. Ask user to hit Enter to acknowledge, then send EXIT
-                input("Press Enter to exit the game…")
+                if not bot:
+                    input("Press Enter to exit the game…")
+                clear_resume_token(session_file)
                 goodbye = QGPMessage(MsgType.EXIT, message="Client says: exit")
                 print(f"{timestamp()} [client] Sending EXIT: {goodbye}")
-                await conn.send(QuicStreamEvent(sid, goodbye.to_bytes(), True))
+                await conn.send(QuicStreamEvent(sid, goodbye.to_bytes(ctx.codec), True))
                 ctx.advanceState()
                 print(f"{timestamp()} [client] State change: STATE_ACTIVE → {ctx.state.name}")
                 conn.close()
-                return
+                return final_msg
 
             # Otherwise, print the list of valid moves with indices
             print(f"{timestamp()} [client] Available moves:")
@@ -414,33 +702,46 @@ async def clientProtocol(scope: Dict, conn: EchoQuicConnection):
                 print(f"  {idx} → {move_str}")
             print(f"  -1 → exit")
 
-            # Prompt user for input
-            user_input = input("Enter move index (or -1 to exit): ").strip()
-            if user_input.lower() in ("-1", "exit"):
+            # Prompt user for input until it can be sent; a bot picks one of the moves at random
+            # indices the server does not list are sent anyway and answered with an error, but one that does
+            # not fit in a SEND_COMMAND is asked for again here
+            while True:
+                move_index = None
+                if bot:
+                    user_input = str(random.randrange(len(moves_list))) if moves_list else "-1"
+                else:
+                    user_input = input("Enter move index (or -1 to exit): ").strip()
+                if user_input.lower() in ("-1", "exit"):
+                    break
+                try:
+                    move_index = int(user_input)
+                except ValueError:
+                    print(f"{timestamp()} [client] Invalid input; you must type an integer index or -1.")
+                    continue
+                if MOVE_INDEX_MIN <= move_index <= MOVE_INDEX_MAX:
+                    break
+                print(f"{timestamp()} [client] Invalid input; {move_index} is not a move index.")
+
+            if move_index is None:
+                clear_resume_token(session_file)
                 goodbye = QGPMessage(MsgType.EXIT, message="Client says: exit")
                 print(f"{timestamp()} [client] Sending EXIT: {goodbye}")
-                await conn.send(QuicStreamEvent(sid, goodbye.to_bytes(), True))
+                await conn.send(QuicStreamEvent(sid, goodbye.to_bytes(ctx.codec), True))
                 ctx.advanceState()
                 print(f"{timestamp()} [client] State change: STATE_ACTIVE → {ctx.state.name}")
                 conn.close()
                 return
 
-            # Otherwise, try to parse an integer
-            try:
-                move_index = int(user_input)
-            except ValueError:
-                print(f"{timestamp()} [client] Invalid input; you must type an integer index or -1.")
-                continue
-
             # Build and send SEND_COMMAND(moveIndex)
             cmd_msg = QGPMessage(MsgType.SEND_COMMAND, moveIndex=move_index)
             print(f"{timestamp()} [client] Sending SEND_COMMAND: {cmd_msg}")
-            await conn.send(QuicStreamEvent(sid, cmd_msg.to_bytes(), False))
+            await conn.send(QuicStreamEvent(sid, cmd_msg.to_bytes(ctx.codec), False))
             continue
 
         elif serverMsg.type == MsgType.EXIT:
             farewell = serverMsg.fields.get("message", "")
             print(f"{timestamp()} [client] Received EXIT from server: {farewell}")
+            clear_resume_token(session_file)
             ctx.advanceState()
             print(f"{timestamp()} [client] State change: STATE_ACTIVE → {ctx.state.name}")
             return
@@ -450,148 +751,364 @@ async def clientProtocol(scope: Dict, conn: EchoQuicConnection):
             return
 
 
+#credentials for the login: the ones given on the command line, otherwise asked for
+def client_credentials(scope: Dict):
+    if scope.get("username") is None:
+        username = input("  Username: ").strip()
+        password = input("  Password: ").strip()
+        return username, password
+    return scope["username"], scope.get("password") or ""
+
+
+#the client keeps the resume token of its current game in a file, so --resume can continue it after the
+#connection or the client itself went away
+def load_resume_token(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+#saving is only a convenience for a later --resume, so a file that cannot be written does not end the game
+def save_resume_token(path: str, token: str):
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(token)
+    except OSError as e:
+        print(f"{timestamp()} [client] Warning: could not save the resume token to {path}: {e}")
+
+
+def clear_resume_token(path: Optional[str]):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
 # QUIC Protocol Handler
 class EchoServerHandler:
-    def __init__(self, connection, protocol, stream_id: int):
+    def __init__(self, connection, protocol, stream_id: int, settings: ServerSettings):
         self.connection = connection
         self.protocol   = protocol
         self.stream_id  = stream_id
+        self.settings   = settings
         self.queue      = asyncio.Queue()
+        self.decoder    = FrameDecoder()
+        self.conn       = EchoQuicConnection(self._send, self._receive, self._close, None)
         self._protocol_task: Optional[asyncio.Task] = None
 
     async def handle_event(self, event):
-        # Enqueue the raw PDU
-        if isinstance(event, StreamDataReceived):
-            self.queue.put_nowait(
-                QuicStreamEvent(event.stream_id, event.data, event.end_stream)
-            )
-        else:
+        # Reassemble the stream and enqueue every complete PDU
+        if not isinstance(event, StreamDataReceived):
+            return
+        try:
+            payloads = self.decoder.feed(event.data)
+        except ValueError as e:
+            await send_protocol_error(self.conn, self.stream_id, f"Bad frame: {e}")
             return
+        for payload in payloads:
+            self.queue.put_nowait(QuicStreamEvent(event.stream_id, payload, False))
+        if event.end_stream:
+            # an empty event tells the protocol the peer finished the stream
+            self.queue.put_nowait(QuicStreamEvent(event.stream_id, b"", True))
 
         # On the very first PDU, spawn one long‐running serverProtocol
         # this ensures that the state is not accidentally reset
-        if self._protocol_task is None:
-            conn = EchoQuicConnection(self._send, self._receive, self._close, None)
+        if self._protocol_task is None and not self.queue.empty():
             self._protocol_task = asyncio.create_task(
-                serverProtocol(conn, self.stream_id)
+                serverProtocol(self.conn, self.stream_id, self.settings, self.protocol)
             )
 
     async def _receive(self) -> QuicStreamEvent:
         return await self.queue.get()
 
     async def _send(self, qev: QuicStreamEvent):
-        self.connection.send_stream_data(qev.stream_id, qev.data, qev.end_stream)
+        self.connection.send_stream_data(qev.stream_id, qev.framed(), qev.end_stream)
         self.protocol.transmit()
 
+    # ends this stream's session; the connection is closed with its last session, other games on it go on
     def _close(self):
         self.protocol.remove_handler(self.stream_id)
-        self.connection.close()
+        if not self.protocol.has_handlers():
+            self.connection.close()
+
+
+#one game of the client on its own stream; EchoClientHandler queues the PDUs of that stream here
+class ClientGameStream:
+    def __init__(self, handler: "EchoClientHandler"):
+        self.handler = handler
+        self.stream_id = None
+        self.queue = asyncio.Queue()
+        self.conn = EchoQuicConnection(handler._send, self.queue.get, self._close, self._new_stream)
+
+    # clientProtocol sends its hello right after taking the id, without yielding to the other games,
+    # so no two games are handed the same unused stream id
+    def _new_stream(self) -> int:
+        self.stream_id = self.handler.connection.get_next_available_stream_id()
+        self.handler.streams[self.stream_id] = self
+        return self.stream_id
+
+    # a finished game only gives up its stream; the handler closes the connection after the last game
+    def _close(self):
+        self.handler.streams.pop(self.stream_id, None)
 
 
 class EchoClientHandler:
-    def __init__(self, connection, protocol):
+    def __init__(self, connection, protocol, scope: Optional[Dict] = None):
         self.connection = connection
         self.protocol = protocol
-        self.queue = asyncio.Queue()
-        self._stream_id_assigned = False
+        self.scope = scope if scope is not None else {}
+        self.streams: Dict[int, ClientGameStream] = {}
+        self.decoders: Dict[int, FrameDecoder] = {}
+        self._launched = False
         self.done = asyncio.Event()
 
     def quic_event_received(self, event):
         if isinstance(event, StreamDataReceived):
-            self.queue.put_nowait(
-                QuicStreamEvent(event.stream_id, event.data, event.end_stream)
-            )
-
+            game = self.streams.get(event.stream_id)
+            decoder = self.decoders.setdefault(event.stream_id, FrameDecoder())
+            for payload in decoder.feed(event.data):
+                if game is not None:
+                    game.queue.put_nowait(QuicStreamEvent(event.stream_id, payload, False))
+            if event.end_stream:
+                self.decoders.pop(event.stream_id, None)
+
+    # starts the client protocol once: at the end of the handshake, or right after connecting when the
+    # CLIENT_HELLO can go out as 0-RTT early data on a resumed session
+    def start(self):
+        if not self._launched:
+            self._launched = True
+            asyncio.ensure_future(self.launch())
+
+    # plays scope["games"] games at once, each on its own stream with its own ConnectionContext
+    # the first game logs in; the others start once it is confirmed and skip the login, since the server
+    # knows the user of the connection. Only the first game uses the resume token
     async def launch(self):
-        conn = EchoQuicConnection(self._send, self._receive, self._close, self._new_stream)
-        await clientProtocol({}, conn)
+        games = max(1, int(self.scope.get("games", 1)))
+        logged_in = asyncio.Event()
+        first = asyncio.ensure_future(clientProtocol(dict(self.scope, logged_in=logged_in),
+                                                     ClientGameStream(self).conn))
+        tasks = [first]
+        if games > 1:
+            waiter = asyncio.ensure_future(logged_in.wait())
+            await asyncio.wait([first, waiter], return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if logged_in.is_set():
+                later = dict(self.scope, authenticated=True, resume=False, session_file=None)
+                for _ in range(games - 1):
+                    tasks.append(asyncio.ensure_future(clientProtocol(later, ClientGameStream(self).conn)))
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                traceback.print_exception(result)
+        if games > 1:
+            finished = sum(isinstance(result, str) for result in results)
+            print(f"{timestamp()} [client] {finished} of {games} games played to the end on one connection")
+            for index, result in enumerate(results):
+                if isinstance(result, BaseException):
+                    result = f"failed: {result!r}"
+                print(f"  game {index + 1}: {result or 'not finished'}")
 
+        self.connection.close()
         self.done.set()
 
-    async def _receive(self) -> QuicStreamEvent:
-        return await self.queue.get()
-
     async def _send(self, qev: QuicStreamEvent):
-        self.connection.send_stream_data(qev.stream_id, qev.data, qev.end_stream)
+        self.connection.send_stream_data(qev.stream_id, qev.framed(), qev.end_stream)
         self.protocol.transmit()
 
-    def _new_stream(self) -> int:
-        sid = self.connection.get_next_available_stream_id()
-        return sid
-
-    def _close(self):
-        self.connection.close()
-
 
 class AsyncQGPProtocol(QuicConnectionProtocol):
-    def __init__(self, *args, mode=None, **kwargs):
+    def __init__(self, *args, mode=None, settings: Optional[ServerSettings] = None,
+                 scope: Optional[Dict] = None, **kwargs):
         super().__init__(*args, **kwargs)
         self._mode = mode
+        self._settings = settings
         self._handlers = {}
+        self._closed_streams = set()
         self._handler = None
+        # server: name of the user logged in on this connection, shared by all of its streams
+        self.user = None
 
         if mode == "client":
-            self._handler = EchoClientHandler(self._quic, self)
+            self._handler = EchoClientHandler(self._quic, self, scope)
 
     def quic_event_received(self, event):
         if isinstance(event, HandshakeCompleted):
-            print(f"[protocol:{self._mode}] HandshakeCompleted (connection is up)")
+            print(f"[protocol:{self._mode}] HandshakeCompleted (connection is up, "
+                  f"resumed={event.session_resumed}, early data accepted={event.early_data_accepted})")
             if self._mode == "client":
-                asyncio.ensure_future(self._handler.launch())
+                self._handler.start()
 
         if isinstance(event, StreamDataReceived):
             print(f"[protocol:{self._mode}] StreamDataReceived on stream {event.stream_id}, {len(event.data)} bytes")
             if self._mode == "server":
+                if event.stream_id in self._closed_streams:
+                    # the session on this stream has ended; late data is dropped, not taken for a new game
+                    return
                 handler = self._handlers.setdefault(
                     event.stream_id,
-                    EchoServerHandler(self._quic, self, event.stream_id)
+                    EchoServerHandler(self._quic, self, event.stream_id, self._settings)
                 )
                 asyncio.ensure_future(handler.handle_event(event))
             else:
                 self._handler.quic_event_received(event)
 
+        if isinstance(event, ConnectionTerminated) and self._mode == "server":
+            # the peer is gone: end every session on this connection; their games stay in the session registry
+            for stream_id, handler in list(self._handlers.items()):
+                handler.queue.put_nowait(QuicStreamEvent(stream_id, b"", True))
+
     def remove_handler(self, stream_id: int):
         self._handlers.pop(stream_id, None)
+        self._closed_streams.add(stream_id)
+
+    def has_handlers(self) -> bool:
+        return bool(self._handlers)
 
 
 # Determine which main script to run
 # server is bound to 0.0.0.0   print the local IP
-async def run_server(listen_address: str, listen_port: int, configuration: QuicConfiguration):
+# Like aioquic's serve(), but binds with SO_REUSEPORT so every worker of a multi-process server can listen on
+# the same UDP port; the kernel spreads incoming datagrams over the workers by address, so each client's
+# connection stays on one worker
+async def serve_reuseport(host: str, port: int, **kwargs) -> QuicServer:
+    loop = asyncio.get_running_loop()
+    _, protocol = await loop.create_datagram_endpoint(
+        lambda: QuicServer(**kwargs),
+        local_addr=(host, port),
+        reuse_port=True
+    )
+    return protocol
+
+# runs until SIGTERM or SIGINT, then stops accepting datagrams and shuts the AI pool down
+async def run_server(listen_address: str, listen_port: int, configuration: QuicConfiguration,
+                     settings: ServerSettings, ticket_store=None, reuse_port: bool = False):
     bind_host = "0.0.0.0" if listen_address in ("", "localhost") else listen_address
     print(f"[server] Server starting... Listening on {bind_host}:{listen_port}")
+    print(f"[server] AI moves computed by: {settings.ai_pool}, board engine: {settings.engine}")
+    print(f"[server] AI opponent: {settings.describe_agent()}")
     printLocalIPs()
-    await serve(
+    if ticket_store is None:
+        ticket_store = SessionTicketStore()
+    server = await (serve_reuseport if reuse_port else serve)(
         host=bind_host,
         port=listen_port,
         configuration=configuration,
-        create_protocol=lambda *args, **kwargs: AsyncQGPProtocol(*args, mode="server", **kwargs),
-        session_ticket_fetcher=SessionTicketStore().pop,
-        session_ticket_handler=SessionTicketStore().add
+        create_protocol=lambda *args, **kwargs: AsyncQGPProtocol(*args, mode="server", settings=settings, **kwargs),
+        session_ticket_fetcher=ticket_store.pop,
+        session_ticket_handler=ticket_store.add
     )
-    await asyncio.Future() 
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+        print("[server] Shutting down")
+    finally:
+        server.close()
+        print(f"[server] Session tickets: {ticket_store}")
+        settings.close()
+
+# Body of one worker process of a multi-process server: everything it prints goes to its own log file
+# the worker builds its own settings, AI pool and event loop after the fork, so nothing is shared with the
+# parent except the listening port and the session ticket directory
+def run_worker(args, index: int, ticket_dir: str):
+    log_path = os.path.join(args.log_dir, f"server-{index}.log")
+    fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+    sys.stdout = open(1, "w", buffering=1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+    print(f"[server] {timestamp()} worker {index} started, pid {os.getpid()}")
+    asyncio.run(run_server(args.listen, args.port, serverConfig(args.cert_file, args.key_file),
+                           server_settings(args), FileTicketStore(ticket_dir, args.ticket_store_size),
+                           reuse_port=True))
+    print(f"[server] {timestamp()} worker {index} stopped")
+
+# Forks 'workers' server processes that share the UDP port and a file-backed session ticket store
+# SIGTERM / SIGINT are passed on to the workers, which finish shutting down before this returns
+def run_workers(args, workers: int):
+    ticket_dir = args.ticket_dir or tempfile.mkdtemp(prefix="qgp-tickets-")
+    os.makedirs(args.log_dir, exist_ok=True)
+    print(f"[server] Starting {workers} workers on port {args.port}, logs in {args.log_dir}, "
+          f"session tickets in {ticket_dir}")
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    children = {}
+    for index in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(args, index, ticket_dir)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        children[pid] = index
+        print(f"[server] worker {index}: pid {pid}")
+
+    def forward(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None:
+            print(f"[server] worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+    if not args.ticket_dir:
+        shutil.rmtree(ticket_dir, ignore_errors=True)
 
 # query user for IP address
-async def run_client(server: str, server_port: int, configuration: QuicConfiguration):
+# with a ticket cache the client resumes the previous session with this server when it still holds a valid
+# ticket, and keeps the ticket the server issues now for the next run; on a resumed session the CLIENT_HELLO
+# is sent as 0-RTT early data, before the handshake has finished, unless early_data is off
+async def run_client(server: str, server_port: int, configuration: QuicConfiguration, scope: Dict,
+                     ticket_cache: Optional[ClientTicketCache] = None, early_data: bool = True):
     print(f"[client] Client connecting to {server}:{server_port}...")
+    server_key = f"{server}:{server_port}"
+    ticket_handler = None
+    if ticket_cache is not None:
+        configuration.session_ticket = ticket_cache.load(server_key)
+        ticket_handler = lambda ticket: ticket_cache.save(server_key, ticket)
+    ticket = configuration.session_ticket
+    send_early = early_data and ticket is not None and ticket.max_early_data_size is not None
+    if ticket is not None:
+        print(f"[client] Resuming the previous session{' with 0-RTT' if send_early else ''}")
     async with connect(
         server,
         server_port,
         configuration=configuration,
-        create_protocol=lambda *args, **kwargs: AsyncQGPProtocol(*args, mode="client", **kwargs)
+        create_protocol=lambda *args, **kwargs: AsyncQGPProtocol(*args, mode="client", scope=scope, **kwargs),
+        session_ticket_handler=ticket_handler,
+        wait_connected=not send_early
     ) as client:
+        if send_early:
+            client._handler.start()
         await client._handler.done.wait()
 
-#TLS bypassed in this demos
-class SessionTicketStore:
-    def __init__(self):
-        self.tickets = {}
-
-    def add(self, ticket: SessionTicket):
-        self.tickets[ticket.ticket] = ticket
-
-    def pop(self, label: bytes):
-        return self.tickets.pop(label, None)
-
 
 def printLocalIPs():
     hostname = socket.gethostname()
@@ -615,6 +1132,13 @@ def serverConfig(certFile: str, keyFile: str) -> QuicConfiguration:
     return configuration
 
 
+def server_settings(args) -> ServerSettings:
+    return ServerSettings(AIWorkerPool(args.ai_workers, args.ai_executor, args.ai_cache), args.engine,
+                          ai_move_ms=args.ai_move_ms, ai_agent=args.ai_agent, ai_eval=args.ai_eval,
+                          book=args.book, ai_endgame=args.ai_endgame,
+                          sessions=SessionRegistry(args.session_limit, args.session_idle))
+
+
 def clientConfig() -> QuicConfiguration:
     configuration = QuicConfiguration(alpn_protocols=[ALPN], is_client=True)
     configuration.verify_mode = False
@@ -634,11 +1158,74 @@ def parse_args():
                                help="Path to TLS certificate PEM file")
     server_parser.add_argument("--key-file", type=str, required=True,
                                help="Path to TLS private key PEM file")
+    server_parser.add_argument("--ai-workers", type=int, default=4,
+                               help="Number of AI search workers, 0 searches on the event loop (default: 4)")
+    server_parser.add_argument("--ai-executor", choices=EXECUTOR_MODES, default="thread",
+                               help="Run AI searches in a thread or process pool (default: thread)")
+    server_parser.add_argument("--engine", choices=sorted(ENGINES), default="bitboard",
+                               help="Othello board implementation (default: bitboard)")
+    server_parser.add_argument("--ai-move-ms", type=int, default=None,
+                               help="Per-move time budget; switches the AI to iterative-deepening alpha-beta")
+    server_parser.add_argument("--ai-agent", choices=AI_AGENTS, default="auto",
+                               help="AI opponent (default: minimax, alphabeta with --ai-move-ms)")
+    server_parser.add_argument("--ai-eval", choices=sorted(EVALUATORS), default="positional",
+                               help="Evaluation function for minimax / alphabeta (default: positional)")
+    server_parser.add_argument("--ai-cache", type=int, default=100000,
+                               help="Server-wide cache of AI replies by position, in entries; 0 disables it "
+                                    "(default: 100000)")
+    server_parser.add_argument("--ai-endgame", type=int, default=ENDGAME_EMPTIES,
+                               help="Alphabeta plays perfectly from this many empty squares on, 0 disables it "
+                                    f"(default: {ENDGAME_EMPTIES})")
+    server_parser.add_argument("--book", type=str, default=None,
+                               help="Opening book file built with 'python -m Othello.book' (minimax / alphabeta)")
+    server_parser.add_argument("--session-limit", type=int, default=SESSION_LIMIT,
+                               help="Unfinished games kept for RESUME, oldest dropped first; 0 disables resuming "
+                                    f"(default: {SESSION_LIMIT})")
+    server_parser.add_argument("--session-idle", type=float, default=SESSION_IDLE_SECONDS,
+                               help="Seconds an unfinished game can stay idle before it is forgotten "
+                                    f"(default: {SESSION_IDLE_SECONDS})")
+    server_parser.add_argument("--workers", type=int, default=1,
+                               help="Server processes sharing the port through SO_REUSEPORT (default: 1)")
+    server_parser.add_argument("--log-dir", type=str, default="logs",
+                               help="With --workers > 1, directory of the per-worker logs (default: logs)")
+    server_parser.add_argument("--ticket-dir", type=str, default=None,
+                               help="Keep TLS session tickets in files in this directory, shared by all processes "
+                                    "(default: in memory; a temporary directory with --workers > 1)")
+    server_parser.add_argument("--ticket-store-size", type=int, default=TICKET_STORE_SIZE,
+                               help="Session tickets kept for resumption; 0 disables resumption "
+                                    f"(default: {TICKET_STORE_SIZE})")
 
     client_parser = subparsers.add_parser("client", help="Run as client")
     client_parser.add_argument("--server", "-s", type=str, help="Server IP address")
     client_parser.add_argument("--port", "-p", type=int, default=12345,
                                help="Server port (default: 12345)")
+    client_parser.add_argument("--binary", action="store_true",
+                               help="Ask the server for the compact binary PDU codec")
+    client_parser.add_argument("--delta", action="store_true",
+                               help="Ask the server to send board changes instead of full boards")
+    client_parser.add_argument("--fast-start", action="store_true",
+                               help="Log in with the hello and get the first board in one round trip")
+    client_parser.add_argument("--games", type=int, default=1,
+                               help="Play this many games at once, each on its own stream of one connection "
+                                    "(default: 1)")
+    client_parser.add_argument("--bot", action="store_true",
+                               help="Play random moves without asking and leave finished games on their own")
+    client_parser.add_argument("--user", type=str, default=None,
+                               help="Log in with this user name instead of asking for one")
+    client_parser.add_argument("--password", type=str, default=None,
+                               help="Password to log in with when --user is given")
+    client_parser.add_argument("--resume", action="store_true",
+                               help="Continue the unfinished game of the previous run instead of logging in")
+    client_parser.add_argument("--session-file", type=str,
+                               default=os.path.join(os.path.expanduser("~"), ".qgp_session"),
+                               help="File keeping the resume token of the current game (default: ~/.qgp_session)")
+    client_parser.add_argument("--ticket-cache", type=str,
+                               default=os.path.join(os.path.expanduser("~"), ".qgp_tickets"),
+                               help="File keeping session tickets for fast reconnects (default: ~/.qgp_tickets)")
+    client_parser.add_argument("--no-ticket-cache", action="store_true",
+                               help="Always connect with a full handshake and keep no tickets")
+    client_parser.add_argument("--no-early-data", action="store_true",
+                               help="Resume sessions without sending CLIENT_HELLO as 0-RTT early data")
 
     return parser.parse_args()
 
@@ -646,11 +1233,31 @@ def parse_args():
 if __name__ == "__main__":
     args = parse_args()
     if args.mode == "server":
-        server_config = serverConfig(args.cert_file, args.key_file)
-        asyncio.run(run_server(args.listen, args.port, server_config))
+        if args.workers > 1:
+            if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+                sys.exit("--workers needs fork() and SO_REUSEPORT (Linux, BSD or macOS)")
+            run_workers(args, args.workers)
+        else:
+            server_config = serverConfig(args.cert_file, args.key_file)
+            if args.ticket_dir:
+                ticket_store = FileTicketStore(args.ticket_dir, args.ticket_store_size)
+            else:
+                ticket_store = SessionTicketStore(args.ticket_store_size)
+            asyncio.run(run_server(args.listen, args.port, server_config, server_settings(args), ticket_store))
     elif args.mode == "client":
         if not args.server:
             args.server = input("Enter server IP address: ").strip()
         client_config = clientConfig()
-        asyncio.run(run_client(args.server, args.port, client_config))
+        options = QGPOption(0)
+        if args.binary:
+            options |= QGPOption.BINARY_CODEC
+        if args.delta:
+            options |= QGPOption.DELTA_STATE
+        if args.fast_start:
+            options |= QGPOption.FAST_START
+        ticket_cache = None if args.no_ticket_cache else ClientTicketCache(args.ticket_cache)
+        scope = {"options": options, "resume": args.resume, "session_file": args.session_file,
+                 "games": args.games, "bot": args.bot, "username": args.user, "password": args.password}
+        asyncio.run(run_client(args.server, args.port, client_config, scope,
+                               ticket_cache, early_data=not args.no_early_data))
     exit(0)
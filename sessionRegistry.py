@@ -0,0 +1,86 @@
+# sessionRegistry.py
+# Games that outlive their QUIC connection.
+# The server issues a resume token in LOGIN_CONFIRM and records the game under it every time the player is
+# asked for a move. If the connection drops, the client can send RESUME with the token on a new connection
+# and carry on from that position instead of starting over.
+# A saved game is only the packed board (two bitmasks + side to move) and the user name, so an idle game costs
+# a few hundred bytes and maxsize bounds the memory as well as the count. The AI agent is not kept: every agent
+# of a server is built from the same settings, so RESUME builds a fresh one rather than holding each game's
+# search tables (an alpha-beta transposition table alone is hundreds of KB). Entries expire after
+# idle_timeout seconds without activity and the oldest are dropped beyond maxsize.
+
+import secrets
+import time
+from collections import OrderedDict
+
+# default cap on saved games and idle time before a game is forgotten
+SESSION_LIMIT = 10000
+SESSION_IDLE_SECONDS = 600
+
+
+class SavedGame:
+    __slots__ = ("username", "packed", "touched")
+
+    def __init__(self, username, packed):
+        self.username = username
+        self.packed = packed
+        self.touched = time.monotonic()
+
+
+#resume token → SavedGame, in least recently touched order
+#only the server's event loop uses it, so there is no locking
+class SessionRegistry:
+    def __init__(self, maxsize: int = SESSION_LIMIT, idle_timeout: float = SESSION_IDLE_SECONDS):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._games = OrderedDict()
+        self.resumed = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._games)
+
+    def __str__(self):
+        return (f"{len(self)}/{self.maxsize} saved games, {self.resumed} resumed, {self.expired} expired, "
+                f"idle timeout {self.idle_timeout:g}s")
+
+    # starts tracking a game and returns its token, or None when the registry is disabled
+    def issue(self, username, state):
+        if self.maxsize <= 0:
+            return None
+        self.purge()
+        token = secrets.token_urlsafe(16)
+        self._games[token] = SavedGame(username, state.pack())
+        while len(self._games) > self.maxsize:
+            self._games.popitem(last=False)
+        return token
+
+    # records the current position of a tracked game; a token already taken over by RESUME is left alone
+    def save(self, token, state):
+        game = self._games.get(token)
+        if game is None:
+            return
+        game.packed = state.pack()
+        game.touched = time.monotonic()
+        self._games.move_to_end(token)
+
+    # removes and returns the game for token, or None if it is unknown or expired
+    def take(self, token):
+        self.purge()
+        game = self._games.pop(token, None)
+        if game is not None:
+            self.resumed += 1
+        return game
+
+    # forgets a game that ended or was left with EXIT
+    def discard(self, token):
+        self._games.pop(token, None)
+
+    def purge(self):
+        limit = time.monotonic() - self.idle_timeout
+        while self._games:
+            token, game = next(iter(self._games.items()))
+            if game.touched >= limit:
+                break
+            del self._games[token]
+            self.expired += 1
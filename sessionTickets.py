@@ -0,0 +1,233 @@
+# sessionTickets.py
+# TLS session tickets, for resuming QUIC connections without a full handshake.
+# The server hands a client a ticket after the handshake; when the client reconnects with it, aioquic asks the
+# server's store for the ticket by its label and the connection resumes, and the client may send its first
+# stream data as 0-RTT early data. A server store is passed to aioquic as session_ticket_handler=store.add and
+# session_ticket_fetcher=store.pop; pop hands a ticket out only once, so 0-RTT data cannot be replayed with it.
+# The client side keeps the last ticket of every server in a ClientTicketCache file between runs.
+
+import base64
+import datetime
+import json
+import os
+import time
+from collections import OrderedDict
+
+from aioquic.tls import SessionTicket, CipherSuite
+
+# labels longer than this are not ours (the server issues 64 byte labels); keeps file names short
+MAX_LABEL = 100
+
+# default number of tickets a server store keeps before dropping the oldest
+TICKET_STORE_SIZE = 10000
+
+# the file store drops expired and surplus tickets once every this many adds
+PURGE_INTERVAL = 256
+
+
+def _valid_label(label: bytes) -> bool:
+    return bool(label) and len(label) <= MAX_LABEL
+
+
+#tickets on disk are plain JSON (bytes as base64, times as ISO 8601), never pickles: a ticket file that
+#someone else managed to write can at worst hold a bad ticket, not run code when it is read
+def ticket_to_json(ticket: SessionTicket) -> dict:
+    def b64(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
+    return {
+        "age_add": ticket.age_add,
+        "cipher_suite": int(ticket.cipher_suite),
+        "not_valid_after": ticket.not_valid_after.isoformat(),
+        "not_valid_before": ticket.not_valid_before.isoformat(),
+        "resumption_secret": b64(ticket.resumption_secret),
+        "server_name": ticket.server_name,
+        "ticket": b64(ticket.ticket),
+        "max_early_data_size": ticket.max_early_data_size,
+        "other_extensions": [[kind, b64(data)] for kind, data in ticket.other_extensions],
+    }
+
+
+#inverse of ticket_to_json; raises ValueError, KeyError or TypeError on malformed input
+def ticket_from_json(fields: dict) -> SessionTicket:
+    def unb64(text: str) -> bytes:
+        return base64.b64decode(text, validate=True)
+
+    def utc(text: str) -> datetime.datetime:
+        moment = datetime.datetime.fromisoformat(text)
+        if moment.tzinfo is None:
+            raise ValueError("ticket times must carry a time zone")
+        return moment
+    max_early = fields["max_early_data_size"]
+    server_name = fields["server_name"]
+    if server_name is not None and not isinstance(server_name, str):
+        raise TypeError("server_name must be a string")
+    return SessionTicket(
+        age_add=int(fields["age_add"]),
+        cipher_suite=CipherSuite(fields["cipher_suite"]),
+        not_valid_after=utc(fields["not_valid_after"]),
+        not_valid_before=utc(fields["not_valid_before"]),
+        resumption_secret=unb64(fields["resumption_secret"]),
+        server_name=server_name,
+        ticket=unb64(fields["ticket"]),
+        max_early_data_size=None if max_early is None else int(max_early),
+        other_extensions=[(int(kind), unb64(data)) for kind, data in fields["other_extensions"]],
+    )
+
+
+# bad ticket data of any kind
+TICKET_ERRORS = (OSError, ValueError, KeyError, TypeError, AttributeError)
+
+
+#in-memory store, private to one server process
+#bounded LRU: tickets are single use, so the oldest entry is also the closest to expiry and is dropped first
+class SessionTicketStore:
+    def __init__(self, maxsize: int = TICKET_STORE_SIZE):
+        self.maxsize = maxsize
+        self.tickets = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __str__(self):
+        return f"{len(self)}/{self.maxsize} tickets, {self.hits} resumed, {self.misses} unknown or expired"
+
+    def add(self, ticket: SessionTicket):
+        if self.maxsize <= 0 or not _valid_label(ticket.ticket):
+            return
+        self.tickets[ticket.ticket] = ticket
+        self.tickets.move_to_end(ticket.ticket)
+        while len(self.tickets) > self.maxsize:
+            self.tickets.popitem(last=False)
+        while self.tickets and not next(iter(self.tickets.values())).is_valid:
+            self.tickets.popitem(last=False)
+
+    def pop(self, label: bytes):
+        ticket = self.tickets.pop(label, None)
+        if ticket is None or not ticket.is_valid:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ticket
+
+
+#store shared by every process of a multi-process server: one JSON ticket per file in 'directory'
+#a client's reconnect can land on any worker, so a ticket issued by one must be found by the others.
+#Writes go through a temporary file and a rename, and pop claims the file with a rename before reading
+#it, so a ticket is never read half-written and is handed out at most once across all processes.
+#Each file's mtime is set to its ticket's expiry, so purge() can drop stale tickets without reading them
+class FileTicketStore:
+    def __init__(self, directory: str, maxsize: int = TICKET_STORE_SIZE):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._adds = 0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def __str__(self):
+        return f"{self.directory}, {self.hits} resumed, {self.misses} unknown or expired"
+
+    def _path(self, label: bytes) -> str:
+        return os.path.join(self.directory, label.hex())
+
+    def add(self, ticket: SessionTicket):
+        if self.maxsize <= 0 or not _valid_label(ticket.ticket):
+            return
+        path = self._path(ticket.ticket)
+        temp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(ticket_to_json(ticket), f)
+        expires = ticket.not_valid_after.timestamp()
+        os.utime(temp, (expires, expires))
+        os.replace(temp, path)
+        self._adds += 1
+        if self._adds % PURGE_INTERVAL == 0:
+            self.purge()
+
+    def pop(self, label: bytes):
+        ticket = None
+        if _valid_label(label):
+            path = self._path(label)
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                claimed = None
+            if claimed is not None:
+                try:
+                    with open(claimed) as f:
+                        ticket = ticket_from_json(json.load(f))
+                except TICKET_ERRORS:
+                    ticket = None
+                finally:
+                    os.unlink(claimed)
+        if ticket is None or not ticket.is_valid or ticket.ticket != label:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ticket
+
+    # Removes expired tickets, then the ones closest to expiry while more than maxsize remain
+    # several processes may purge at once; a file someone else already removed is simply skipped
+    def purge(self):
+        now = time.time()
+        live = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if "." in entry.name:
+                    continue
+                try:
+                    expires = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if expires < now:
+                    self._remove(entry.path)
+                else:
+                    live.append((expires, entry.path))
+        if len(live) > self.maxsize:
+            live.sort()
+            for _, path in live[:len(live) - self.maxsize]:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+#client side: the newest ticket of every server ("host:port"), kept in a file so the next run can resume
+class ClientTicketCache:
+    def __init__(self, path: str):
+        self.path = path
+
+    def _load_all(self) -> dict:
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+            return {server: ticket_from_json(fields) for server, fields in stored.items()}
+        except TICKET_ERRORS:
+            return {}
+
+    # ticket for 'server', or None when there is none or it has expired
+    def load(self, server: str):
+        ticket = self._load_all().get(server)
+        if ticket is None or not ticket.is_valid:
+            return None
+        return ticket
+
+    def save(self, server: str, ticket: SessionTicket):
+        tickets = {name: t for name, t in self._load_all().items() if t.is_valid}
+        tickets[server] = ticket
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({name: ticket_to_json(t) for name, t in tickets.items()}, f)
+        os.replace(temp, self.path)
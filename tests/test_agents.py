@@ -0,0 +1,16 @@
+# tests/test_agents.py
+# Searching agents only ever play legal moves, whatever their transposition table holds.
+
+from Othello.agent import MinimaxAgent
+from Othello.bitboard import BitboardState
+from Othello.transposition import EXACT
+
+
+def test_minimax_ignores_illegal_tt_move():
+    agent = MinimaxAgent(2, ttSize=64)
+    agent.id = 'Player 1'
+    state = BitboardState()
+    # what a colliding key would leave behind: a deep entry whose move is not legal here
+    agent.tt.store(agent.ttKey(state, 1), 10, EXACT, 0, (0, 0))
+    move = agent.choose_move(state)
+    assert (move.x, move.y) in [(m.x, m.y) for m in state.legalMoves()]
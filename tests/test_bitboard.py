@@ -0,0 +1,67 @@
+# tests/test_bitboard.py
+# BitboardState plays exactly like the list-of-lists State: same moves, flips, heuristic, hash and packing.
+
+import random
+
+import pytest
+
+from Othello.othello import State, PLAYER1, PLAYER2
+from Othello.bitboard import BitboardState
+
+
+def assert_same(listState, bitState):
+    assert listState.board == bitState.board
+    assert listState.pack() == bitState.pack()
+    assert listState.heuristic() == bitState.heuristic()
+    assert listState.hash_key() == bitState.hash_key()
+    assert listState.num_empties() == bitState.num_empties()
+    assert listState.game_over() == bitState.game_over()
+    for player in (PLAYER1, PLAYER2):
+        expected = [(m.player, m.x, m.y) for m in listState.generateMoves(player)]
+        assert [(m.player, m.x, m.y) for m in bitState.generateMoves(player)] == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_games_match(seed):
+    rng = random.Random(seed)
+    listState, bitState = State(), BitboardState()
+    while True:
+        assert_same(listState, bitState)
+        if listState.game_over():
+            break
+        moves = listState.generateMoves()
+        if moves:
+            i = rng.randrange(len(moves))
+            listState.make_move(moves[i])
+            bitState.make_move(bitState.generateMoves()[i])
+        else:
+            listState.make_move(None)
+            bitState.make_move(None)
+    assert listState.score() == bitState.score()
+
+
+@pytest.mark.parametrize("engine", [State, BitboardState])
+def test_unmake_restores_position(engine):
+    rng = random.Random(1)
+    state = engine()
+    state.heuristic()
+    undos = []
+    snapshots = []
+    for _ in range(20):
+        moves = state.legalMoves()
+        snapshots.append((state.pack(), state.hash_key(), state.heuristic()))
+        undos.append(state.make_move(rng.choice(moves) if moves else None))
+    while undos:
+        state.unmake_move(undos.pop())
+        assert (state.pack(), state.hash_key(), state.heuristic()) == snapshots.pop()
+        assert state.hash_key() == engine.from_packed(state.pack()).hash_key()
+        assert state.heuristic() == engine.from_packed(state.pack()).heuristic()
+
+
+def test_from_packed_round_trip():
+    state = BitboardState()
+    for _ in range(8):
+        state = state.applyMoveCloning(state.generateMoves()[0])
+    packed = state.pack()
+    assert BitboardState.from_packed(packed).pack() == packed
+    assert State.from_packed(packed).pack() == packed
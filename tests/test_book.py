@@ -0,0 +1,38 @@
+# tests/test_book.py
+# Opening book files: lookups by position hash, and only ever a legal move.
+
+from Othello.bitboard import BitboardState
+from Othello.book import OpeningBook, write_book
+
+
+def test_lookup(tmp_path):
+    start = BitboardState()
+    second = start.applyMoveCloning(start.generateMoves()[0])
+    path = str(tmp_path / "book.bin")
+    opening = start.generateMoves()[2]
+    reply = second.generateMoves()[1]
+    write_book(path, {start.hash_key(): (opening.x, opening.y), second.hash_key(): (reply.x, reply.y),
+                      12345: (0, 0)})
+    book = OpeningBook(path)
+    try:
+        assert len(book) == 3
+        move = book.lookup(start)
+        assert (move.x, move.y) == (opening.x, opening.y)
+        move = book.lookup(second)
+        assert (move.x, move.y) == (reply.x, reply.y)
+        assert book.lookup(second.applyMoveCloning(reply)) is None
+        assert book.find(12345) == (0, 0)
+    finally:
+        book.close()
+
+
+def test_illegal_stored_move_is_ignored(tmp_path):
+    start = BitboardState()
+    path = str(tmp_path / "book.bin")
+    # what a hash collision would look like: a move that is not legal in the position
+    write_book(path, {start.hash_key(): (0, 0)})
+    book = OpeningBook(path)
+    try:
+        assert book.lookup(start) is None
+    finally:
+        book.close()
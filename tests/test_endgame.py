@@ -0,0 +1,71 @@
+# tests/test_endgame.py
+# The exact endgame solver against a plain negamax, and AlphaBeta's use of it under a move time budget.
+
+import random
+import time
+
+import pytest
+
+from Othello.agent import AlphaBeta
+from Othello.bitboard import BitboardState, legal_moves_mask, flips_mask
+from Othello.endgame import EndgameSolver, SolverTimeout
+from Othello.othello import PLAYER1
+
+
+# a random position with 'empties' empty squares where the side to move has a choice
+def random_position(empties, seed):
+    rng = random.Random(seed)
+    while True:
+        state = BitboardState()
+        while state.num_empties() > empties and state.legalMoves():
+            state = state.applyMoveCloning(rng.choice(state.legalMoves()))
+        if state.num_empties() == empties and len(state.legalMoves()) > 1:
+            return state
+
+
+def own_opp(state):
+    p1, p2, side = state.pack()
+    return (p1, p2) if side == PLAYER1 else (p2, p1)
+
+
+# final disc difference for the side to move under perfect play, without pruning
+def negamax(own, opp, passed=False):
+    moves = legal_moves_mask(own, opp)
+    if not moves:
+        if passed:
+            return own.bit_count() - opp.bit_count()
+        return -negamax(opp, own, True)
+    best = -65
+    for sq in range(64):
+        if moves >> sq & 1:
+            flips = flips_mask(own, opp, sq)
+            best = max(best, -negamax(opp ^ flips, own | flips | (1 << sq)))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_solver_matches_negamax(seed):
+    own, opp = own_opp(random_position(7, seed))
+    expected = negamax(own, opp)
+    solver = EndgameSolver()
+    score, square = solver.solve(own, opp)
+    assert score == expected
+    assert legal_moves_mask(own, opp) >> square & 1
+    wld, _ = solver.solve(own, opp, wld=True)
+    assert (wld > 0) - (wld < 0) == (expected > 0) - (expected < 0)
+
+
+def test_solver_deadline():
+    own, opp = own_opp(random_position(16, 0))
+    with pytest.raises(SolverTimeout):
+        EndgameSolver().solve(own, opp, deadline=time.time())
+
+
+def test_alphabeta_endgame_within_budget():
+    state = random_position(16, 0)
+    agent = AlphaBeta(8, moveTimeMs=200, endgameEmpties=16)
+    agent.id = 'Player 1' if state.nextPlayerToMove == PLAYER1 else 'Player 2'
+    start = time.time()
+    move = agent.choose_move(state)
+    assert time.time() - start < 1.0
+    assert (move.x, move.y) in [(m.x, m.y) for m in state.legalMoves()]
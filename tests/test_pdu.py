@@ -0,0 +1,72 @@
+# tests/test_pdu.py
+# QGPMessage round trips through both codecs, board deltas and stream framing.
+
+import pytest
+
+from pdu import (QGPMessage, MsgType, CODEC_JSON, CODEC_BINARY, FrameDecoder, frame, board_delta,
+                 apply_board_delta, MOVE_INDEX_MIN, MOVE_INDEX_MAX)
+
+START = (0x0000000810000000, 0x0000001008000000, 0)
+AFTER = (0x0000000818080000, 0x0000001000000000, 1)
+
+
+@pytest.mark.parametrize("codec", [CODEC_JSON, CODEC_BINARY])
+@pytest.mark.parametrize("mtype, fields", [
+    (MsgType.CLIENT_HELLO, {"message": "Hello", "options": 3}),
+    (MsgType.LOGIN_RESPONSE, {"username": "u", "password": "p"}),
+    (MsgType.LOGIN_CONFIRM, {"status": 0, "message": "ok", "resumeToken": "abc"}),
+    (MsgType.SEND_COMMAND, {"moveIndex": 3}),
+    (MsgType.SEND_COMMAND, {"moveIndex": -1}),
+    (MsgType.SEND_COMMAND, {"moveIndex": MOVE_INDEX_MIN}),
+    (MsgType.SEND_COMMAND, {"moveIndex": MOVE_INDEX_MAX}),
+    (MsgType.RESYNC, {}),
+    (MsgType.RESUME, {"token": "abc"}),
+    (MsgType.EXIT, {"message": "Goodbye"}),
+])
+def test_round_trip(codec, mtype, fields):
+    msg = QGPMessage.from_bytes(QGPMessage(mtype, **fields).to_bytes(codec))
+    assert msg.type == mtype
+    assert msg.fields == fields
+
+
+@pytest.mark.parametrize("fields", [
+    {"board": START, "moves": [19, 26, 37, 44]},
+    {"board": AFTER, "intermediateBoard": START, "moves": [], "final": "Game Over: winner = X"},
+    {"board": START, "moves": [19], "error": "Invalid move index", "seq": 7},
+    {"delta": board_delta(START, AFTER), "intermediateDelta": board_delta(START, START), "moves": [1, 2],
+     "seq": 8},
+])
+def test_binary_game_state(fields):
+    msg = QGPMessage.from_bytes(QGPMessage(MsgType.GAME_STATE, **fields).to_bytes(CODEC_BINARY))
+    assert msg.type == MsgType.GAME_STATE
+    assert msg.fields == fields
+
+
+def test_board_delta():
+    assert apply_board_delta(START, board_delta(START, AFTER)) == AFTER
+    assert apply_board_delta(AFTER, board_delta(AFTER, START)) == START
+
+
+def test_frame_decoder_reassembles_chunks():
+    payloads = [b"a", b"", b"x" * 1000, b"{}"]
+    data = b"".join(frame(p) for p in payloads)
+    decoder = FrameDecoder()
+    received = []
+    for i in range(0, len(data), 7):
+        received += decoder.feed(data[i:i + 7])
+    assert received == payloads
+    assert decoder.pending() == 0
+
+
+def test_frame_decoder_keeps_partial_frame():
+    decoder = FrameDecoder()
+    data = frame(b"first") + frame(b"second")
+    assert decoder.feed(data[:-3]) == [b"first"]
+    assert decoder.pending() > 0
+    assert decoder.feed(data[-3:]) == [b"second"]
+
+
+def test_frame_decoder_rejects_oversized_frame():
+    decoder = FrameDecoder(max_frame_size=16)
+    with pytest.raises(ValueError):
+        decoder.feed(frame(b"x" * 17))
@@ -0,0 +1,28 @@
+# tests/test_players.py
+# Players built by Othello/main.py play for the slot they were created for.
+
+import pytest
+
+from Othello.main import create_player
+from Othello.othello import State, PLAYER1
+
+
+@pytest.mark.parametrize("name", ["mcts-root", "mcts-leaf"])
+def test_mcts_player1_plays_for_player1(name):
+    player = create_player(name, 20, 'Player 1')
+    try:
+        assert player.id == 'Player 1'
+        state = State()
+        move = player.choose_move(state)
+        assert move.player == PLAYER1
+        assert (move.x, move.y) in [(m.x, m.y) for m in state.generateMoves()]
+    finally:
+        player.close()
+
+
+@pytest.mark.parametrize("name", ["mcts-root", "minimax", "alphabeta"])
+def test_player2_slot(name):
+    player = create_player(name, 1, 'Player 2')
+    assert player.id == 'Player 2'
+    if hasattr(player, "close"):
+        player.close()
@@ -0,0 +1,160 @@
+# tests/test_sessions.py
+# Resumable games (sessionRegistry.py) and the TLS session ticket stores (sessionTickets.py).
+
+import datetime
+import json
+import os
+
+import pytest
+from aioquic.tls import SessionTicket, CipherSuite
+
+import sessionRegistry
+from sessionRegistry import SessionRegistry
+from sessionTickets import (SessionTicketStore, FileTicketStore, ClientTicketCache, ticket_to_json,
+                            ticket_from_json)
+from Othello.bitboard import BitboardState
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessionRegistry.time, "monotonic", clock)
+    return clock
+
+
+def test_registry_save_and_take(clock):
+    registry = SessionRegistry()
+    state = BitboardState()
+    token = registry.issue("u", state)
+    state = state.applyMoveCloning(state.generateMoves()[0])
+    registry.save(token, state)
+    game = registry.take(token)
+    assert (game.username, game.packed) == ("u", state.pack())
+    # a token is good for one resume
+    assert registry.take(token) is None
+    assert registry.resumed == 1
+
+
+def test_registry_expires_idle_games(clock):
+    registry = SessionRegistry(idle_timeout=60)
+    idle = registry.issue("idle", BitboardState())
+    clock.now += 30
+    active = registry.issue("active", BitboardState())
+    clock.now += 40
+    assert registry.take(idle) is None
+    assert registry.take(active) is not None
+    assert registry.expired == 1
+
+
+def test_registry_save_keeps_game_alive(clock):
+    registry = SessionRegistry(idle_timeout=60)
+    token = registry.issue("u", BitboardState())
+    clock.now += 50
+    registry.save(token, BitboardState())
+    clock.now += 50
+    assert registry.take(token) is not None
+
+
+def test_registry_drops_oldest_beyond_maxsize(clock):
+    registry = SessionRegistry(maxsize=2)
+    tokens = [registry.issue(f"u{i}", BitboardState()) for i in range(3)]
+    assert len(registry) == 2
+    assert registry.take(tokens[0]) is None
+    assert registry.take(tokens[2]) is not None
+
+
+def test_registry_disabled_and_discard(clock):
+    assert SessionRegistry(maxsize=0).issue("u", BitboardState()) is None
+    registry = SessionRegistry()
+    token = registry.issue("u", BitboardState())
+    registry.discard(token)
+    assert registry.take(token) is None
+
+
+def make_ticket(label=b"label-1", valid=True):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    after = now + datetime.timedelta(hours=1 if valid else -1)
+    return SessionTicket(age_add=12345, cipher_suite=CipherSuite.AES_128_GCM_SHA256,
+                         not_valid_after=after, not_valid_before=now - datetime.timedelta(hours=2),
+                         resumption_secret=b"\x00secret\xff", server_name="localhost", ticket=label,
+                         max_early_data_size=0xFFFFFFFF, other_extensions=[(42, b"\x01\x02")])
+
+
+def test_ticket_json_round_trip():
+    ticket = make_ticket()
+    assert ticket_from_json(json.loads(json.dumps(ticket_to_json(ticket)))) == ticket
+
+
+def test_ticket_json_rejects_naive_times():
+    fields = ticket_to_json(make_ticket())
+    fields["not_valid_after"] = "2030-01-01T00:00:00"
+    with pytest.raises(ValueError):
+        ticket_from_json(fields)
+
+
+def test_memory_store_hands_out_once():
+    store = SessionTicketStore()
+    ticket = make_ticket()
+    store.add(ticket)
+    assert store.pop(ticket.ticket) == ticket
+    assert store.pop(ticket.ticket) is None
+    store.add(make_ticket(b"old", valid=False))
+    assert store.pop(b"old") is None
+
+
+def test_memory_store_is_bounded():
+    store = SessionTicketStore(maxsize=2)
+    for i in range(3):
+        store.add(make_ticket(b"t%d" % i))
+    assert len(store) == 2
+    assert store.pop(b"t0") is None
+
+
+def test_file_store_shared_between_instances(tmp_path):
+    ticket = make_ticket()
+    FileTicketStore(str(tmp_path)).add(ticket)
+    (path,) = tmp_path.iterdir()
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    other = FileTicketStore(str(tmp_path))
+    assert other.pop(ticket.ticket) == ticket
+    assert other.pop(ticket.ticket) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_file_store_ignores_bad_files(tmp_path):
+    store = FileTicketStore(str(tmp_path))
+    label = b"label-1"
+    (tmp_path / label.hex()).write_bytes(b"\x80\x04not json")
+    assert store.pop(label) is None
+    # a ticket filed under another label is not handed out
+    store.add(make_ticket(b"label-2"))
+    os.rename(tmp_path / b"label-2".hex(), tmp_path / label.hex())
+    assert store.pop(label) is None
+
+
+def test_file_store_purge(tmp_path):
+    store = FileTicketStore(str(tmp_path), maxsize=2)
+    store.add(make_ticket(b"expired", valid=False))
+    for i in range(3):
+        store.add(make_ticket(b"t%d" % i))
+    store.purge()
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_client_cache(tmp_path):
+    cache = ClientTicketCache(str(tmp_path / "missing" / "tickets"))
+    assert cache.load("host:1") is None
+    ticket = make_ticket()
+    cache.save("host:1", ticket)
+    cache.save("host:2", make_ticket(b"other"))
+    assert cache.load("host:1") == ticket
+    (tmp_path / "missing" / "tickets").write_text("not json")
+    assert cache.load("host:1") is None
@@ -0,0 +1,40 @@
+# tests/test_transposition.py
+# Replacement policy of the two-slot transposition table buckets.
+
+from Othello.transposition import TranspositionTable, EXACT, LOWER, DEPTH, SCORE
+
+
+def test_depth_preferred_slot_keeps_deepest():
+    tt = TranspositionTable(4)
+    tt.new_search()
+    tt.store(1, 6, EXACT, 10)
+    # same bucket, shallower: goes to the always-replace slot
+    tt.store(5, 2, EXACT, 20)
+    assert tt.probe(1)[DEPTH] == 6
+    assert tt.probe(5)[SCORE] == 20
+    # the always-replace slot takes the next shallow entry
+    tt.store(9, 1, EXACT, 30)
+    assert tt.probe(5) is None
+    assert tt.probe(9)[SCORE] == 30
+    assert tt.probe(1)[SCORE] == 10
+
+
+def test_same_key_is_overwritten():
+    tt = TranspositionTable(4)
+    tt.store(1, 6, EXACT, 10)
+    tt.store(1, 2, LOWER, 12)
+    assert tt.probe(1)[DEPTH] == 2
+
+
+def test_older_search_gives_up_deep_slot():
+    tt = TranspositionTable(4)
+    tt.new_search()
+    tt.store(1, 6, EXACT, 10)
+    tt.new_search()
+    tt.store(5, 2, EXACT, 20)
+    assert tt.probe(1) is None
+    assert tt.probe(5)[SCORE] == 20
+
+
+def test_size_rounds_up_to_power_of_two():
+    assert TranspositionTable(100).buckets == 128